@@ -0,0 +1,184 @@
+"""
+Accuracy and performance checks for the Math module, run with:
+    python Benchmark.py
+
+NewtonAccuracy - Compare the newton evaluation paths against exact rational arithmetic
+PointModelBenchmark - Compare memory and refresh allocations of list based points against PointStore
+"""
+from fractions import Fraction
+import random
+import time
+import tracemalloc
+import numpy as np
+from Math import *
+from PointStore import *
+
+
+def NewtonFromReference(g):
+    # Original expansion, rebuilding every basis product with PolyMultiply
+    p = []
+    for i in range(len(g)):
+        temp = [1]
+        for j in range(i):
+            temp = PolyMultiply(temp, [-j, 1])
+        p = PolyAdd(p, PolyScale(temp, g[i][0]))
+    return p
+
+
+def ExactNewton(values, t):
+    g = [Fraction(v) for v in values]
+    coeffs = [g[0]]
+    for i in range(1, len(g)):
+        g = [(g[j + 1] - g[j]) / i for j in range(len(g) - 1)]
+        coeffs.append(g[0])
+
+    result = []
+    for x in t:
+        x = Fraction(x)
+        y = Fraction(0)
+        for i in reversed(range(len(coeffs))):
+            y = y * (x - i) + coeffs[i]
+        result.append(float(y))
+    return np.array(result)
+
+
+def NewtonAccuracy(sizes=(5, 10, 15, 20, 25, 30, 40), samples=100, seed=0):
+    random.seed(seed)
+    t = np.linspace(0, 1, num=samples)
+    print("Newton max relative error against exact arithmetic (%i samples)" % samples)
+    print("%6s %18s %18s %18s" % ("points", "PolyMultiply", "NewtonFrom+Horner", "NewtonHorner"))
+
+    for n in sizes:
+        values = [random.uniform(-50.0, 50.0) for i in range(n)]
+        table = NewtonTable()
+        for v in values:
+            table.append(v, 0.0)
+
+        exact = ExactNewton(values, t)
+        scale = max(np.abs(exact).max(), 1.0)
+
+        reference = np.array([PolyValue(x, NewtonFromReference(table.gx)) for x in t])
+        monomial = PolyHorner(NewtonFrom(table.gx), t)[0]
+        nested = NewtonHorner(table.gx, t)[0]
+
+        print(
+            "%6i %18.3e %18.3e %18.3e"
+            % (
+                n,
+                np.abs(reference - exact).max() / scale,
+                np.abs(monomial - exact).max() / scale,
+                np.abs(nested - exact).max() / scale,
+            )
+        )
+
+
+class ListPoint:
+    # Original point model, small python lists per point
+    def __init__(self, px, py, vx=None, vy=None, ax=None, ay=None, m=1):
+        self.p = [px, py]
+        self.v = [vx, vy] if vx is not None else None
+        self.a = [ax, ay] if ax is not None else None
+        self.m = m
+
+
+def ListRefresh(points):
+    # Per-point append loops, as newtonUpdate/updateData used to build them
+    p = [], []
+    vel = [], []
+    acc = [], []
+    vel_vec = [], []
+    vel_vec_con = []
+    acc_vec = [], []
+    acc_vec_con = []
+    interpolant = [], []
+    mass = []
+    for point in points:
+        p[0].append(point.p[0])
+        p[1].append(point.p[1])
+        interpolant[0].append(point.p[0])
+        interpolant[1].append(point.p[1])
+        mass.append(point.m)
+        if point.v is None:
+            continue
+        vel[0].append(point.p[0] + point.v[0])
+        vel[1].append(point.p[1] + point.v[1])
+        vel_vec[0].extend((point.p[0], point.p[0] + point.v[0]))
+        vel_vec[1].extend((point.p[1], point.p[1] + point.v[1]))
+        vel_vec_con.extend((1, 0))
+        interpolant[0].append(point.v[0])
+        interpolant[1].append(point.v[1])
+        if point.a is None:
+            continue
+        acc[0].append(point.p[0] + point.a[0])
+        acc[1].append(point.p[1] + point.a[1])
+        acc_vec[0].extend((point.p[0], point.p[0] + point.a[0]))
+        acc_vec[1].extend((point.p[1], point.p[1] + point.a[1]))
+        acc_vec_con.extend((1, 0))
+        interpolant[0].append(point.a[0])
+        interpolant[1].append(point.a[1])
+    return np.array(p), np.array(vel), np.array(vel_vec), np.array(vel_vec_con), np.array(interpolant)
+
+
+def StoreRefresh(store):
+    # Array slices, as GraphContext.updateData builds them now
+    n = len(store)
+    p = store.positions[:n]
+    has_vel = store.has_vel[:n]
+    has_acc = store.has_acc[:n] & has_vel
+    vel = p[has_vel] + store.velocities[:n][has_vel]
+    acc = p[has_acc] + store.accelerations[:n][has_acc]
+    vel_vec = np.empty((2 * len(vel), 2))
+    vel_vec[0::2] = p[has_vel]
+    vel_vec[1::2] = vel
+    values = np.stack((p, store.velocities[:n], store.accelerations[:n]), axis=1)
+    mask = np.stack((np.ones(n, dtype=bool), has_vel, has_acc), axis=1)
+    return p, vel, acc, vel_vec, values[mask]
+
+
+def Measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return result, elapsed, current, peak, blocks
+
+
+def PointModelBenchmark(count=10000, seed=0):
+    random.seed(seed)
+    rows = []
+    for i in range(count):
+        row = [random.uniform(-50.0, 50.0), random.uniform(-50.0, 50.0)]
+        if random.random() < 0.5:
+            row += [random.uniform(-5.0, 5.0), random.uniform(-5.0, 5.0)]
+            if random.random() < 0.5:
+                row += [random.uniform(-5.0, 5.0), random.uniform(-5.0, 5.0)]
+        rows.append(row)
+
+    def BuildList():
+        return [ListPoint(*row) for row in rows]
+
+    def BuildStore():
+        store = PointStore()
+        for row in rows:
+            store.append(*row)
+        return store
+
+    print("Point model at %i points" % count)
+    print("%-22s %12s %12s %12s %10s" % ("", "time (ms)", "live (KiB)", "peak (KiB)", "blocks"))
+    points, *stats = Measure(BuildList)
+    print("%-22s %12.2f %12.1f %12.1f %10i" % ("list points: build", stats[0] * 1e3, stats[1] / 1024, stats[2] / 1024, stats[3]))
+    store, *stats = Measure(BuildStore)
+    print("%-22s %12.2f %12.1f %12.1f %10i" % ("PointStore: build", stats[0] * 1e3, stats[1] / 1024, stats[2] / 1024, stats[3]))
+    _, *stats = Measure(ListRefresh, points)
+    print("%-22s %12.2f %12.1f %12.1f %10i" % ("list points: refresh", stats[0] * 1e3, stats[1] / 1024, stats[2] / 1024, stats[3]))
+    _, *stats = Measure(StoreRefresh, store)
+    print("%-22s %12.2f %12.1f %12.1f %10i" % ("PointStore: refresh", stats[0] * 1e3, stats[1] / 1024, stats[2] / 1024, stats[3]))
+
+
+if __name__ == "__main__":
+    NewtonAccuracy()
+    print()
+    PointModelBenchmark()
@@ -1,46 +1,151 @@
-import enum
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pyqtgraph as pg
 from PySide6.QtWidgets import QVBoxLayout, QLabel
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, QObject, Signal
 from PySide6.QtGui import QFont
 from PointDetailWidget import *
-from Math import *
-
-
-class SelectionType(enum.Enum):
-    POINT = 1
-    VEL = 2
-    ACC = 3
-
-
-class InterpolationType(enum.Enum):
-    NEWTON = 1
-    BEZIER = 2
-
-
-class Point:
-    def __init__(self, px, py, vx=None, vy=None, ax=None, ay=None, m=1):
-        self.p = [px, py]
-        self.v = [vx, vy] if vx is not None else None
-        self.a = [ax, ay] if ax is not None else None
-        self.m = m
-
-    def __iter__(self):
-        return iter((self.p, self.v, self.a, self.m))
+from InterpolationModel import *
+from SpatialIndex import *
+
+
+class RefreshScheduler:
+    """
+    Coalesces refresh requests into at most one recompute per frame.
+
+    requested - Number of refresh requests received
+    frames - Number of recomputes actually run
+    merged - Requests folded into a recompute that was already pending
+    dropped - Pending requests discarded without a recompute (e.g. on clear)
+
+    Once nothing is pending, requested == frames + merged + dropped.
+    """
+
+    def __init__(self, callback, interval=16):
+        self.callback = callback
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        self.pending = 0
+        self.requested = 0
+        self.frames = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def request(self):
+        self.requested += 1
+        self.pending += 1
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def satisfy(self):
+        # A recompute is running now, which covers everything pending
+        if self.pending:
+            self.merged += self.pending - 1
+            self.frames += 1
+        self.pending = 0
+        self.timer.stop()
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.callback()
+
+    def cancel(self):
+        self.dropped += self.pending
+        self.pending = 0
+        self.timer.stop()
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "frames": self.frames,
+            "merged": self.merged,
+            "dropped": self.dropped,
+        }
+
+
+class CurveSignal(QObject):
+    sigCurve = Signal(int, object, object)
+    sigError = Signal(object)
+
+
+class PlotBuffer:
+    """
+    Preallocated x and y arrays for one plot item, filled in place and grown
+    geometrically, setData gets contiguous views so nothing is converted.
+
+    points - Compress the masked rows of an (n, 2) array of positions
+    pairs - Interleave masked start and end positions for connect="pairs"
+    """
+
+    def __init__(self, capacity=64):
+        self.x = np.empty(capacity)
+        self.y = np.empty(capacity)
+
+    def reserve(self, size):
+        if size > len(self.x):
+            capacity = max(size, 2 * len(self.x))
+            self.x = np.empty(capacity)
+            self.y = np.empty(capacity)
+
+    def points(self, xy, mask):
+        n = np.count_nonzero(mask)
+        self.reserve(n)
+        np.compress(mask, xy[:, 0], out=self.x[:n])
+        np.compress(mask, xy[:, 1], out=self.y[:n])
+        return self.x[:n], self.y[:n]
+
+    def pairs(self, start, end, mask):
+        n = 2 * np.count_nonzero(mask)
+        self.reserve(n)
+        np.compress(mask, start[:, 0], out=self.x[0:n:2])
+        np.compress(mask, end[:, 0], out=self.x[1:n:2])
+        np.compress(mask, start[:, 1], out=self.y[0:n:2])
+        np.compress(mask, end[:, 1], out=self.y[1:n:2])
+        return self.x[:n], self.y[:n]
+
+
+class ScratchArrays:
+    """
+    Named per-frame temporaries, kept between frames and grown geometrically.
+
+    get - View of the named array with the given shape and dtype
+    """
+
+    def __init__(self):
+        self.arrays = {}
+
+    def get(self, name, shape, dtype=float):
+        size = int(np.prod(shape))
+        array = self.arrays.get(name)
+        if array is None or array.dtype != dtype or len(array) < size:
+            capacity = size if array is None else max(size, 2 * len(array))
+            array = np.empty(max(capacity, 64), dtype=dtype)
+            self.arrays[name] = array
+        return array[:size].reshape(shape)
 
 
 class GraphContext:
-    def __init__(self, graph: pg.PlotWidget, points_ui: QVBoxLayout):
+    def __init__(self, graph: pg.PlotWidget, points_ui: QVBoxLayout, points_scroll):
 
         pg.setConfigOption("leftButtonPan", False)
-        self.points = []
-        self.interpolant = [], []
-        self.masses = []
-        self.sample = [], []
-        self.interpolation_type = InterpolationType.BEZIER
-        self.max_point = 20
-        self.use_gen_point = False
+        # Points and curve math live in the Qt-free model, this class only draws
+        self.model = InterpolationModel(InterpolationType.BEZIER)
+        self.points = self.model.points
+        self.scheduler = RefreshScheduler(self.refresh)
+
+        # Curves are computed on a single worker thread from a snapshot of the
+        # points, results older than curve_generation are dropped
+        self.use_worker = True
+        self.curve_executor = ThreadPoolExecutor(max_workers=1)
+        self.curve_future = None
+        self.curve_generation = 0
+        self.curve_signal = CurveSignal()
+        self.curve_signal.sigCurve.connect(self.applyCurve, Qt.QueuedConnection)
+        self.curve_signal.sigError.connect(self.curveFailed, Qt.QueuedConnection)
+        self.closed = False
         """
         The following are default information used to set-up the grid
         """
@@ -69,6 +174,11 @@ class GraphContext:
 
         # internal click/release mouse events
         self.click_scale = 1.0
+
+        # Hit-testing grid over point, velocity and acceleration handles, handle
+        # 3 * i + k is point i with k = 0 point, 1 velocity, 2 acceleration
+        self.hits = SpatialGrid(self.click_scale)
+        self.hits_dirty = True
         self.internalMousePressEvent = self.graph.mousePressEvent
         self.internalMouseReleaseEvent = self.graph.mouseReleaseEvent
         self.internalMouseDoubleClickEvent = self.graph.mouseDoubleClickEvent
@@ -124,17 +234,65 @@ class GraphContext:
         self.graph.addItem(self.vel_scatter)
         self.graph.addItem(self.acc_scatter)
         self.graph.addItem(self.curve_plot)
-        font = QFont()
-        font.setPixelSize(12)
+
+        # Level of detail, handles and labels outside the view are culled and
+        # labels are dropped once they would cover label_density of the view
+        self.lod = True
+        self.view_rect = None
+        self.label_density = 0.25
+        self.label_size = 160, 16
+        self.coords_shown = set()
+
+        # Point indices whose labels changed since the last frame, and the
+        # (text, x, y) each TextItem currently shows
+        self.labels_dirty = set()
+        self.coord_state = {}
+        self.setLod(self.lod)
+
+        # Handle data is written into the same arrays every refresh
+        self.buffers = {
+            name: PlotBuffer() for name in ("point", "vel", "acc", "vel_vector", "acc_vector")
+        }
+        self.scratch = ScratchArrays()
+
+        # Hover highlight, one item moved onto the handle under the cursor and
+        # updated at most once per frame
+        self.hover_enabled = True
+        self.hover = None
+        self.hover_scatter = pg.ScatterPlotItem(
+            size=14, pen=pg.mkPen("w", width=2), brush=None, pxMode=True
+        )
+        self.hover_scatter.setZValue(10)
+        self.graph.addItem(self.hover_scatter)
+        self.hover_scheduler = RefreshScheduler(self.hoverUpdate)
+        # Coord labels are allocated on first use and recycled afterwards
+        self.coord_font = QFont()
+        self.coord_font.setPixelSize(12)
         self.coords = []
-        for i in range(60):
-            text = pg.TextItem()
-            text.setVisible(False)
-            text.setFont(font)
-            self.coords.append(text)
-            self.graph.addItem(text)
 
-        self.point_details_list = []
+        # Side panel rows are recycled, only the points in view have a widget
+        self.syncing = False
+        self.point_details = PointDetailsPanel(
+            self.points_ui, points_scroll, self.createPointDetails, self.bindPointDetails
+        )
+        self.point_details.setCompact(self.interpolation_type == InterpolationType.BEZIER)
+
+    @property
+    def interpolation_type(self):
+        return self.model.interpolation_type
+
+    def setInterpolationType(self, interpolation_type):
+        if interpolation_type == self.interpolation_type:
+            return
+        self.model.setInterpolationType(interpolation_type)
+
+        # Rows show or hide their derivative frames, every handle and label may change
+        self.point_details.setCompact(interpolation_type == InterpolationType.BEZIER)
+        self.invalidateHits()
+        self.markLabels(*range(len(self.points)))
+        self.hover = None
+        self.hover_scatter.clear()
+        self.refresh()
 
     def mousePressWrapper(self, ev):
         self.internalMousePressEvent(ev)
@@ -155,6 +313,33 @@ class GraphContext:
 
         if self.type is not None:
             self.movePoint(self.index, self.type, self.mouse_x, self.mouse_y)
+        if self.hover_enabled:
+            self.hover_scheduler.request()
+
+    def hoverUpdate(self):
+        self.hover_scheduler.satisfy()
+
+        # While dragging the grabbed handle stays highlighted
+        if self.type is not None:
+            index, type = self.index, self.type
+        else:
+            index, type = self.mouseChecker(self.mouse_x, self.mouse_y)
+        if type is None or index >= len(self.points):
+            if self.hover is not None:
+                self.hover = None
+                self.hover_scatter.clear()
+            return
+
+        point = self.points[index]
+        x, y = point.p
+        if type == SelectionType.VEL:
+            x, y = x + point.v[0], y + point.v[1]
+        elif type == SelectionType.ACC:
+            x, y = x + point.a[0], y + point.a[1]
+        hover = index, type, x, y
+        if hover != self.hover:
+            self.hover = hover
+            self.hover_scatter.setData([x], [y])
 
     def sceneMouseDoubleClick(self, ev):
         if ev.buttons() == Qt.MouseButton.LeftButton:
@@ -169,21 +354,14 @@ class GraphContext:
             if self.type is None:
                 return
 
-            if self.interpolation_type == InterpolationType.BEZIER and self.index != 0:
+            if not self.model.hasDerivatives(self.index):
                 return
 
-            if self.points[self.index].v is None:
-                self.type = SelectionType.VEL
-                self.points[self.index].v = [
-                    self.mouse_x - self.points[self.index].p[0],
-                    self.mouse_y - self.points[self.index].p[1],
-                ]
-            elif self.points[self.index].a is None:
-                self.type = SelectionType.ACC
-                self.points[self.index].a = [
-                    self.mouse_x - self.points[self.index].p[0],
-                    self.mouse_y - self.points[self.index].p[1],
-                ]
+            type = self.model.addHandle(self.index, self.mouse_x, self.mouse_y)
+            if type is not None:
+                self.type = type
+            self.invalidateHits()
+            self.markLabels(self.index)
             self.refresh()
             self.graph.setMouseEnabled(False, False)
 
@@ -202,13 +380,42 @@ class GraphContext:
         range = self.graph.visibleRange()
         xdiff = range.right() - range.left()
         self.click_scale = abs(xdiff * 0.01)
+        self.view_rect = range.left(), range.right(), range.top(), range.bottom()
+
+        # Pixel size first, the LOD thresholds below are measured in pixels
+        pixel_size = self.vb.viewPixelSize()
+        resample = False
+        if pixel_size[0] > 0.0 and pixel_size[1] > 0.0:
+            if self.model.pixel_size is None or not np.allclose(
+                pixel_size, self.model.pixel_size
+            ):
+                self.model.pixel_size = pixel_size
+                resample = True
+
+        if self.lod and len(self.points):
+            self.labelUpdate()
+            self.handleUpdate()
+
+        # Resample the curve when the zoom level changes
+        if resample and self.model.adaptive_sample and len(self.points):
+            self.updateCurve()
+
+    def close(self):
+        # Stop pending refreshes and the curve worker, a running job's result
+        # is dropped by the generation check and nothing evaluates afterwards,
+        # so the worker is the last to touch the model caches
+        self.closed = True
+        self.scheduler.cancel()
+        self.hover_scheduler.cancel()
+        self.curve_generation += 1
+        self.curve_future = None
+        self.curve_executor.shutdown(wait=False, cancel_futures=True)
 
     def clear(self):
         # Graph Data
-        self.points.clear()
-        self.interpolant = [], []
-        self.sample = [], []
-        self.use_gen_point = False
+        self.model.clear()
+        self.invalidateHits()
+        self.curve_generation += 1
 
         # Plot Data
         self.point_scatter.clear()
@@ -217,92 +424,184 @@ class GraphContext:
         self.vel_vector.clear()
         self.acc_vector.clear()
         self.curve_plot.clear()
-        while self.points_ui.layout().count():
-            child = self.points_ui.layout().takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        self.point_details_list.clear()
+        self.point_details.setCount(0)
+        self.scheduler.cancel()
+        self.hover_scheduler.cancel()
+        self.hover_scatter.clear()
+        self.hover = None
 
         # Coords
         for coords in self.coords:
             coords.setVisible(False)
+        self.coords_shown = set()
+        self.labels_dirty = set()
 
         # Refresh graph
         self.graph.scene().update()
 
-    def mouseChecker(self, x, y):
-        min_dis = self.click_scale
-        for i, point in enumerate(self.points):
-
-            if point.a is not None:
-                dis = np.linalg.norm(
-                    np.array(
-                        [x - (point.p[0] + point.a[0]), y - (point.p[1] + point.a[1])]
-                    )
-                )
-                if dis < min_dis:
-                    return i, SelectionType.ACC
-
-            if point.v is not None:
-                dis = np.linalg.norm(
-                    np.array(
-                        [x - (point.p[0] + point.v[0]), y - (point.p[1] + point.v[1])]
-                    )
-                )
-                if dis < min_dis:
-                    return i, SelectionType.VEL
+    def setLod(self, enabled):
+        self.lod = enabled
+        self.curve_plot.setDownsampling(auto=enabled, method="peak")
+        self.curve_plot.setClipToView(enabled)
+        if len(self.points):
+            self.labelUpdate()
+            self.handleUpdate()
+
+    def viewMask(self, low, high=None, out=None):
+        # Boxes from low to high that touch the view, everything without LOD.
+        # With out given the mask is built in place from scratch arrays
+        if high is None:
+            high = low
+        n = len(low)
+        if out is None:
+            out = np.empty(n, dtype=bool)
+        if not self.lod or self.view_rect is None:
+            out[:] = True
+            return out
+        left, right, top, bottom = self.view_rect
+        lo = self.scratch.get("view_lo", n)
+        hi = self.scratch.get("view_hi", n)
+        inside = self.scratch.get("view_inside", n, bool)
+        out[:] = True
+        for axis, a, b in ((0, left, right), (1, top, bottom)):
+            np.minimum(low[:, axis], high[:, axis], out=lo)
+            np.maximum(low[:, axis], high[:, axis], out=hi)
+            out &= np.greater_equal(hi, min(a, b), out=inside)
+            out &= np.less_equal(lo, max(a, b), out=inside)
+        return out
+
+    def maxLabels(self):
+        if not self.lod or self.view_rect is None or self.model.pixel_size is None:
+            return None
+        left, right, top, bottom = self.view_rect
+        width = abs(right - left) / self.model.pixel_size[0]
+        height = abs(bottom - top) / self.model.pixel_size[1]
+        return int(
+            self.label_density * width * height / (self.label_size[0] * self.label_size[1])
+        )
 
-            dis = np.linalg.norm(np.array([x - point.p[0], y - point.p[1]]))
-            if dis < min_dis:
-                return i, SelectionType.POINT
-        return None, None
+    def coord(self, index):
+        while len(self.coords) <= index:
+            text = pg.TextItem()
+            text.setVisible(False)
+            text.setFont(self.coord_font)
+            self.coords.append(text)
+            self.graph.addItem(text)
+        return self.coords[index]
 
-    def addPoint(self, px, py, vx=None, vy=None, ax=None, ay=None, m=1):
+    def invalidateHits(self):
+        self.hits_dirty = True
 
-        index = len(self.points)
+    def handlePositions(self):
+        n = len(self.points)
+        p = self.points.positions[:n]
+        positions = np.stack(
+            (p, p + self.points.velocities[:n], p + self.points.accelerations[:n]),
+            axis=1,
+        )
+        valid = np.stack(
+            (np.ones(n, dtype=bool), self.points.has_vel[:n], self.points.has_acc[:n]),
+            axis=1,
+        )
+        return positions.reshape(-1, 2), valid.reshape(-1)
 
-        if index >= self.max_point:
+    def moveHits(self, index):
+        # Incremental update of one point's handles while dragging
+        if self.hits_dirty:
             return
+        point = self.points[index]
+        self.hits.move(3 * index, point.p[0], point.p[1])
+        if point.v is not None:
+            self.hits.move(3 * index + 1, point.p[0] + point.v[0], point.p[1] + point.v[1])
+        if point.a is not None:
+            self.hits.move(3 * index + 2, point.p[0] + point.a[0], point.p[1] + point.a[1])
 
-        xmax = px + 5
-        xmin = px - 5
-        ymax = py + 5
-        ymin = py - 5
+    def mouseChecker(self, x, y):
+        # Rebuild when stale or when the zoom moved far from the grid spacing
+        if self.hits_dirty or not 0.5 <= self.click_scale / self.hits.cell <= 2.0:
+            self.hits.build(*self.handlePositions(), self.click_scale)
+            self.hits_dirty = False
+
+        hits = self.hits.query(x, y, self.click_scale)
+        if len(hits) == 0:
+            return None, None
+        # Lowest point index wins, then acceleration, velocity and point
+        index, kind = np.divmod(hits, 3)
+        hit = np.lexsort((-kind, index))[0]
+        type = (SelectionType.POINT, SelectionType.VEL, SelectionType.ACC)[kind[hit]]
+        return int(index[hit]), type
 
-        calc_index = index * 3
-        self.coords[calc_index].setText(
-            "[p%i,x:%0.2f,y:%0.2f,m:%0.2f]" % (index, px, py, m)
+    def addPoint(self, px, py, vx=None, vy=None, ax=None, ay=None, m=1):
+        self.addPoints(
+            [[px, py]],
+            [[vx, vy]] if vx is not None else None,
+            [[ax, ay]] if ax is not None else None,
+            [m],
         )
-        self.coords[calc_index].setPos(px, py)
-        self.coords[calc_index].setVisible(True)
 
-        if vx is not None:
-            vx = clamp(px + vx, xmin, xmax) - px
-            vy = clamp(px + vy, ymin, ymax) - py
+    def addPoints(
+        self,
+        positions,
+        velocities=None,
+        accelerations=None,
+        masses=None,
+        has_vel=None,
+        has_acc=None,
+    ):
+        """
+        Append a batch of points and recompute once, e.g. from Parser.ReadPointFile.
+        Velocities and accelerations are clamped to 5 units around their point,
+        the side panel only builds rows for the points in view.
+        """
+        start = self.model.add(
+            positions, velocities, accelerations, masses, has_vel, has_acc
+        )
+        self.point_details.setCount(len(self.points))
+        self.invalidateHits()
+        self.markLabels(*range(start, len(self.points)))
 
-            self.coords[calc_index + 1].setText(
-                "[v%i,x:%0.2f,y:%0.2f]" % (index, vx, vy)
-            )
-            self.coords[calc_index + 1].setPos(px + vx, py + vy)
-            self.coords[calc_index + 1].setVisible(True)
+        self.refresh()
+        self.graph.scene().update()
 
-        if ax is not None:
-            ax = clamp(px + ax, xmin, xmax) - px
-            ay = clamp(py + ay, ymin, ymax) - py
+    def pointDetails(self, index):
+        # Rows are recycled, a point scrolled out of view has no widget
+        return self.point_details.row(index)
+
+    def syncPointDetails(self, index):
+        detail = self.pointDetails(index)
+        if detail is not None:
+            self.bindPointDetails(detail, index)
+
+    def bindPointDetails(self, detail, index):
+        point = self.points[index]
+        # Slider signals would write the same values back into the store
+        self.syncing = True
+        detail.indexValueUpdate(index)
+        detail.massValueUpdate(point.m)
+        detail.pointValueUpdate(0, point.p[0])
+        detail.pointValueUpdate(1, point.p[1])
+        if point.v is not None:
+            detail.velValueUpdate(0, point.v[0])
+            detail.velValueUpdate(1, point.v[1])
+        else:
+            detail.velValueUpdate(0, None)
+        if point.a is not None:
+            detail.accValueUpdate(0, point.a[0])
+            detail.accValueUpdate(1, point.a[1])
+        else:
+            detail.accValueUpdate(0, None)
 
-            self.coords[calc_index + 2].setText(
-                "[a%i,x:%0.2f,y:%0.2f]" % (index, ax, ay)
-            )
-            self.coords[calc_index + 2].setPos(px + ax, py + ay)
-            self.coords[calc_index + 2].setVisible(True)
-        self.points.append(Point(px, py, vx, vy, ax, ay, m))
+        derivatives = self.model.hasDerivatives(index)
+        detail.vel_frame.setVisible(derivatives)
+        detail.acc_frame.setVisible(derivatives)
+        self.syncing = False
 
-        object = PointDetails(index, px, py, m)
+    def createPointDetails(self):
+        object = PointDetails(0, 0.0, 0.0, 1.0)
 
         object.mass_slider.sigDoubleValueChanged.connect(
             lambda f: self.massValueUpdate(object.index_value, f)
         )
-
         object.point_slider[0].sigDoubleValueChanged.connect(
             lambda f: self.pointValueUpdate(object.index_value, 0, f)
         )
@@ -326,468 +625,267 @@ class GraphContext:
 
         object.sigDownChange.connect(self.SwapDown)
         object.sigUpChange.connect(self.SwapUp)
-
-        self.point_details_list.append(object)
-        self.points_ui.addWidget(object)
-
-        if self.interpolation_type == InterpolationType.BEZIER and index != 0:
-          object.acc_frame.setVisible(False)
-          object.vel_frame.setVisible(False)
-            # for i in range(2):
-            #     object.acc_slider_frame[i].setVisible(False)
-            #     object.vel_slider_frame[i].setVisible(False)
-
-        self.refresh()
-        self.graph.scene().update()
+        return object
 
     def deletePoint(self, type, index):
+        if not self.model.delete(type, index):
+            return
         if type == SelectionType.POINT:
-            self.points.pop(index)
-            self.points_ui.layout().itemAt(index).widget().deleteLater()
-            self.point_details_list.pop(index)
-            for i in range(len(self.points)):
-                detail = self.point_details_list[i]
-                point = self.points[i]
-                detail.indexValueUpdate(i)
-                detail.massValueUpdate(point.m)
-                detail.pointValueUpdate(0, point.p[0])
-                detail.pointValueUpdate(1, point.p[1])
-                if point.v is not None:
-                    detail.velValueUpdate(0, point.v[0])
-                    detail.velValueUpdate(1, point.v[1])
-                else:
-                    detail.velValueUpdate(0, None)
-                if point.a is not None:
-                    detail.accValueUpdate(0, point.a[0])
-                    detail.accValueUpdate(1, point.a[1])
-                else:
-                    detail.accValueUpdate(0, None)
-            for i in range(2):
-                self.point_details_list[0].vel_slider_frame[i].setVisible(True)
-                self.point_details_list[0].acc_slider_frame[i].setVisible(True)
-        elif type == SelectionType.VEL and self.points[index].a is None:
-            if self.interpolation_type == InterpolationType.BEZIER and index != 0:
-                return
-            self.points[index].v = None
-            self.points[index].a = None
-            self.point_details_list[index].velValueUpdate(0, None)
-        elif type == SelectionType.ACC:
-            if self.interpolation_type == InterpolationType.BEZIER and index != 0:
-                return
-            self.points[index].a = None
-            self.point_details_list[index].accValueUpdate(0, None)
+            # Only rows at or after index move, the others keep their binding
+            self.point_details.setCount(len(self.points), index)
+        else:
+            self.syncPointDetails(index)
 
-        for coord in self.coords:
-            coord.setVisible(False)
+        self.invalidateHits()
+        # Deleting a point renumbers every label after it
+        self.markLabels(*range(index, len(self.points)))
         self.refresh()
 
     def movePoint(self, index, type, x, y):
-        xmax = self.points[index].p[0] + 5
-        xmin = self.points[index].p[0] - 5
-        ymax = self.points[index].p[1] + 5
-        ymin = self.points[index].p[1] - 5
-        nx = clamp(x, xmin, xmax)
-        ny = clamp(y, ymin, ymax)
-        if type == SelectionType.POINT:
-            self.points[index].p[0] = x
-            self.points[index].p[1] = y
-            self.point_details_list[index].pointValueUpdate(0, self.points[index].p[0])
-            self.point_details_list[index].pointValueUpdate(1, self.points[index].p[1])
-        elif type == SelectionType.VEL:
-            if self.interpolation_type == InterpolationType.BEZIER and index != 0:
-                return
-            self.points[index].v[0] = nx - self.points[index].p[0]
-            self.points[index].v[1] = ny - self.points[index].p[1]
-            self.point_details_list[index].velValueUpdate(0, self.points[index].v[0])
-            self.point_details_list[index].velValueUpdate(1, self.points[index].v[1])
-
-        elif type == SelectionType.ACC:
-            if self.interpolation_type == InterpolationType.BEZIER and index != 0:
-                return
-            self.points[index].a[0] = nx - self.points[index].p[0]
-            self.points[index].a[1] = ny - self.points[index].p[1]
-            self.point_details_list[index].accValueUpdate(0, self.points[index].a[0])
-            self.point_details_list[index].accValueUpdate(1, self.points[index].a[1])
-
-        self.refresh()
-
-    def bezierRefresh(self):
-        if len(self.points) == 0:
+        if not self.model.move(index, type, x, y):
             return
-        self.use_gen_point = False
-
-        if self.points[0].v is not None and self.points[0].a is not None:
-            rvx = []
-            rvy = []
-            rax = []
-            ray = []
-            px = []
-            py = []
-            for point in self.points:
-                px.append(point.p[0])
-                py.append(point.p[1])
-
-            GenerateVelocityAccelerations(
-                rvx,
-                rvy,
-                rax,
-                ray,
-                px,
-                py,
-                self.points[0].v[0],
-                self.points[0].v[1],
-                self.points[0].a[0],
-                self.points[0].a[1],
-            )
+        self.syncPointDetails(index)
+        self.moveHits(index)
+        self.markLabels(index)
+        self.requestRefresh()
 
-            for i in range(len(rvx)):
-                point = self.points[i]
-                point.v = [rvx[i], rvy[i]]
-                point.a = [rax[i], ray[i]]
-
-            self.use_gen_point = True
+    def requestRefresh(self):
+        # Mark dirty, the recompute runs once on the next frame
+        self.scheduler.request()
 
     def refresh(self):
+        self.scheduler.satisfy()
 
-        if self.interpolation_type == InterpolationType.BEZIER:
-            self.bezierRefresh()
+        self.model.update()
+        if self.model.use_gen_point:
+            # Handles were regenerated from the first moved point onwards
+            self.invalidateHits()
+            self.markLabels(*range(self.model.changedFrom(), len(self.points)))
 
-        for index, point in enumerate(self.points):
+        self.labelUpdate()
+        self.updateData()
+        if self.hover is not None:
+            # Handles may have moved under a resting cursor
+            self.hover_scheduler.request()
+        self.graph.scene().update()
+
+    def markLabels(self, *indices):
+        self.labels_dirty.update(indices)
+
+    def setLabel(self, calc_index, text, x, y):
+        # Qt text layout is the expensive part, skip it when nothing changed
+        coord = self.coord(calc_index)
+        state = self.coord_state.get(calc_index)
+        if state is None or state[0] != text:
+            coord.setText(text)
+        if state is None or state[1:] != (x, y):
+            coord.setPos(x, y)
+        self.coord_state[calc_index] = text, x, y
+        if calc_index not in self.coords_shown:
+            coord.setVisible(True)
+            self.coords_shown.add(calc_index)
+
+    def hideLabel(self, calc_index):
+        if calc_index in self.coords_shown:
+            self.coords[calc_index].setVisible(False)
+            self.coords_shown.discard(calc_index)
+
+    def labelUpdate(self):
+        # Label points whose handles can reach the view, unless too dense
+        n = len(self.points)
+        p = self.points.positions[:n]
+        visible = np.nonzero(self.viewMask(p - 5.0, p + 5.0))[0]
+        limit = self.maxLabels()
+        if limit is not None and len(visible) > limit:
+            visible = visible[:0]
+
+        keep = set(visible.tolist())
+        for calc_index in list(self.coords_shown):
+            if calc_index // 3 not in keep:
+                self.hideLabel(calc_index)
+
+        # Only rewrite points that changed or just came into view
+        dirty = self.labels_dirty
+        self.labels_dirty = set()
+        for index in keep:
             calc_index = index * 3
-            self.coords[calc_index].setText(
-                "[p%i,x:%0.2f,y:%0.2f,m:%0.2f]"
-                % (index, point.p[0], point.p[1], point.m)
+            if index not in dirty and calc_index in self.coords_shown:
+                continue
+            point = self.points[index]
+            px, py = float(point.p[0]), float(point.p[1])
+            self.setLabel(
+                calc_index,
+                "[p%i,x:%0.2f,y:%0.2f,m:%0.2f]" % (index, px, py, point.m),
+                px,
+                py,
             )
-            self.coords[calc_index].setPos(point.p[0], point.p[1])
-            self.coords[calc_index].setVisible(True)
 
             if point.v is not None:
-                self.coords[calc_index + 1].setText(
-                    "[v%i,x:%0.2f,y:%0.2f]" % (index, point.v[0], point.v[1])
+                vx, vy = float(point.v[0]), float(point.v[1])
+                self.setLabel(
+                    calc_index + 1,
+                    "[v%i,x:%0.2f,y:%0.2f]" % (index, vx, vy),
+                    px + vx,
+                    py + vy,
                 )
-                self.coords[calc_index + 1].setPos(
-                    point.p[0] + point.v[0], point.p[1] + point.v[1]
-                )
-                self.coords[calc_index + 1].setVisible(True)
+            else:
+                self.hideLabel(calc_index + 1)
 
             if point.a is not None:
-                self.coords[calc_index + 2].setText(
-                    "[a%i,x:%0.2f,y:%0.2f]" % (index, point.a[0], point.a[1])
+                ax, ay = float(point.a[0]), float(point.a[1])
+                self.setLabel(
+                    calc_index + 2,
+                    "[a%i,x:%0.2f,y:%0.2f]" % (index, ax, ay),
+                    px + ax,
+                    py + ay,
                 )
-                self.coords[calc_index + 2].setPos(
-                    point.p[0] + point.a[0], point.p[1] + point.a[1]
-                )
-                self.coords[calc_index + 2].setVisible(True)
-
-        self.updateData()
-        self.graph.scene().update()
+            else:
+                self.hideLabel(calc_index + 2)
 
-    def newtonUpdate(self, p, vel, acc, vel_vec, vel_vec_con, acc_vec, acc_vec_con):
-        for point in self.points:
-            p[0].append(point.p[0])
-            p[1].append(point.p[1])
-            self.interpolant[0].append(point.p[0])
-            self.interpolant[1].append(point.p[1])
-            self.mass.append(point.m)
+    def derivativeUpdate(self):
+        # Push generated Bezier velocities and accelerations into visible rows
+        n = len(self.points)
+        has_vel = self.points.has_vel[:n]
+        has_acc = self.points.has_acc[:n]
 
-            if point.v is None:
-                continue
-            vel[0].append(point.p[0] + point.v[0])
-            vel[1].append(point.p[1] + point.v[1])
-            vel_vec[0].append(point.p[0])
-            vel_vec[0].append(point.p[0] + point.v[0])
-            vel_vec[1].append(point.p[1])
-            vel_vec[1].append(point.p[1] + point.v[1])
-            vel_vec_con.append(1)
-            vel_vec_con.append(0)
-            self.interpolant[0].append(point.v[0])
-            self.interpolant[1].append(point.v[1])
-
-            if point.a is None:
+        self.syncing = True
+        for index, detail in self.point_details.visibleRows():
+            if not has_vel[index]:
                 continue
-            acc[0].append(point.p[0] + point.a[0])
-            acc[1].append(point.p[1] + point.a[1])
-            acc_vec[0].append(point.p[0])
-            acc_vec[0].append(point.p[0] + point.a[0])
-            acc_vec[1].append(point.p[1])
-            acc_vec[1].append(point.p[1] + point.a[1])
-            acc_vec_con.append(1)
-            acc_vec_con.append(0)
-            self.interpolant[0].append(point.a[0])
-            self.interpolant[1].append(point.a[1])
-
-    def bezierUpdate(self, p, vel, acc, vel_vec, vel_vec_con, acc_vec, acc_vec_con):
-        n = len(self.points) - 1
-
-        for index, point in enumerate(self.points):
-            p[0].append(point.p[0])
-            p[1].append(point.p[1])
-            if point.v is None or index == 0 or index == n:
-                self.interpolant[0].append(point.p[0])
-                self.interpolant[1].append(point.p[1])
-                self.mass.append(point.m)
-
-            if point.v is None:
+            point = self.points[index]
+            detail.velValueUpdate(0,point.v[0])
+            detail.velValueUpdate(1,point.v[1])
+            if not has_acc[index]:
                 continue
-            vel[0].append(point.p[0] + point.v[0])
-            vel[1].append(point.p[1] + point.v[1])
-            vel_vec[0].append(point.p[0])
-            vel_vec[0].append(point.p[0] + point.v[0])
-            vel_vec[1].append(point.p[1])
-            vel_vec[1].append(point.p[1] + point.v[1])
-            vel_vec_con.append(1)
-            vel_vec_con.append(0)
-            self.point_details_list[index].velValueUpdate(0,point.v[0])
-            self.point_details_list[index].velValueUpdate(1,point.v[1])
-
-            # if index == 0 or index != n:
-            #     cfx = point.p[0] + (point.v[0] / n if n > 0 else point.v[0])
-            #     cfy = point.p[1] + (point.v[1] / n if n > 0 else point.v[1])
-            #     self.interpolant[0].append(cfx)
-            #     self.interpolant[1].append(cfy)
-            #     self.mass.append(point.m)
-
-            if point.a is None:
-                continue
-            acc[0].append(point.p[0] + point.a[0])
-            acc[1].append(point.p[1] + point.a[1])
-            acc_vec[0].append(point.p[0])
-            acc_vec[0].append(point.p[0] + point.a[0])
-            acc_vec[1].append(point.p[1])
-            acc_vec[1].append(point.p[1] + point.a[1])
-            acc_vec_con.append(1)
-            acc_vec_con.append(0)
-            self.point_details_list[index].accValueUpdate(0,point.a[0])
-            self.point_details_list[index].accValueUpdate(1,point.a[1])
-            # if index == 0 or index != n:
-            #     csx = 2 * cfx - point.p[0] + (point.a[0] / n if n > 0 else point.a[0])
-            #     csy = 2 * cfy - point.p[1] + (point.a[1] / n if n > 0 else point.a[1])
-            #     self.interpolant[0].append(csx)
-            #     self.interpolant[1].append(csy)
-            #     self.mass.append(point.m)
+            detail.accValueUpdate(0,point.a[0])
+            detail.accValueUpdate(1,point.a[1])
+        self.syncing = False
 
     def updateData(self):
-        p = [], []
-        vel = [], []
-        acc = [], []
-
-        vel_vec = [], []
-        vel_vec_con = []
+        if self.interpolation_type == InterpolationType.BEZIER:
+            self.derivativeUpdate()
 
-        acc_vec = [], []
-        acc_vec_con = []
+        self.handleUpdate()
+        self.updateCurve()
 
-        self.interpolant = [], []
-        self.mass = []
+    def handleUpdate(self):
+        # Every temporary lives in self.scratch, the plot data is compressed
+        # straight into the buffers
+        n = len(self.points)
+        p = self.points.positions[:n]
+        vel = np.add(p, self.points.velocities[:n], out=self.scratch.get("vel", (n, 2)))
+        acc = np.add(
+            p, self.points.accelerations[:n], out=self.scratch.get("acc", (n, 2))
+        )
+        visible = self.viewMask(p, out=self.scratch.get("visible", n, bool))
+        has_vel = self.viewMask(p, vel, out=self.scratch.get("has_vel", n, bool))
+        has_vel &= self.points.has_vel[:n]
+        has_acc = self.viewMask(p, acc, out=self.scratch.get("has_acc", n, bool))
+        has_acc &= self.points.has_acc[:n]
+        has_acc &= self.points.has_vel[:n]
+
+        # Cull handles and vectors outside the visible range
+        self.point_scatter.setData(*self.buffers["point"].points(p, visible))
+        self.vel_scatter.setData(*self.buffers["vel"].points(vel, has_vel))
+        self.acc_scatter.setData(*self.buffers["acc"].points(acc, has_acc))
+        self.vel_vector.setData(
+            *self.buffers["vel_vector"].pairs(p, vel, has_vel), connect="pairs"
+        )
+        self.acc_vector.setData(
+            *self.buffers["acc_vector"].pairs(p, acc, has_acc), connect="pairs"
+        )
 
-        if self.interpolation_type == InterpolationType.NEWTON:
-            self.newtonUpdate(p, vel, acc, vel_vec, vel_vec_con, acc_vec, acc_vec_con)
-        else:
-            self.bezierUpdate(p, vel, acc, vel_vec, vel_vec_con, acc_vec, acc_vec_con)
+    def updateCurve(self):
+        if self.closed:
+            return
+        snapshot = self.model.snapshot()
+        self.curve_generation += 1
+        generation = self.curve_generation
 
-        self.point_scatter.setData(p[0], p[1])
-        self.vel_scatter.setData(vel[0], vel[1])
-        self.acc_scatter.setData(acc[0], acc[1])
-        self.vel_vector.setData(vel_vec[0], vel_vec[1], connect=np.array(vel_vec_con))
-        self.acc_vector.setData(acc_vec[0], acc_vec[1], connect=np.array(acc_vec_con))
-        self.updateCurve()
+        if not self.use_worker:
+            self.applyCurve(generation, *self.model.evaluate(snapshot))
+            return
 
-    def updateCurve(self):
+        # Only the newest request matters, drop one that has not started yet
+        if self.curve_future is not None:
+            self.curve_future.cancel()
+        self.curve_future = self.curve_executor.submit(
+            self.curveJob, generation, snapshot
+        )
+        self.curve_future.add_done_callback(self.curveDone)
 
-        t = np.linspace(0, 1, num=500)
-        self.sample_x = []
-        self.sample_y = []
-        if self.interpolation_type == InterpolationType.NEWTON:
-
-            # Calculate divided difference table
-            # Reset
-            gx = []
-            gy = []
-
-            # Stage 0
-            if len(self.interpolant[0]):
-                gx.append(self.interpolant[0])
-                gy.append(self.interpolant[1])
-
-            # # Other stages
-            for i in range(len(self.interpolant[0]) - 1):
-                temp_x = []
-                temp_y = []
-
-                for j in range(len(gx[i]) - 1):
-                    temp_x.append((gx[i][j + 1] - gx[i][j]) / (i + 1 + j - j))
-                    temp_y.append((gy[i][j + 1] - gy[i][j]) / (i + 1 + j - j))
-                gx.append(temp_x)
-                gy.append(temp_y)
-
-            # Calculate the polynomial using newton form
-            px = NewtonFrom(gx)
-            py = NewtonFrom(gy)
-
-            for i in range(len(t)):
-                self.sample_x.append(PolyValue(t[i], px))
-                self.sample_y.append(PolyValue(t[i], py))
-
-        elif self.interpolation_type == InterpolationType.BEZIER:
-
-            if self.use_gen_point == False:
-                n = len(self.interpolant[0])
-                if n < 2:
-                    self.curve_plot.setData(self.sample_x, self.sample_y)
-                    return
-
-                for i in range(len(t)):
-                    ## Rational DeCasteljau
-                    # RationalDeCasteljau(self.sample_x, self.sample_y, self.interpolant[0].copy(),self.interpolant[1].copy(),self.mass.copy(),t[i])
-
-                    ## Rational Bezier
-                    r_x, r_y = RationalBezier(
-                        self.interpolant[0], self.interpolant[1], self.mass, t[i]
-                    )
-                    self.sample_x.append(r_x)
-                    self.sample_y.append(r_y)
+    def curveJob(self, generation, snapshot):
+        if generation != self.curve_generation:
+            return
+        x, y = self.model.evaluate(snapshot)
+        self.curve_signal.sigCurve.emit(generation, x, y)
 
-            else:
-                irx = []
-                iry = []
-                irm = []
-                ipx = []
-                ipy = []
-                im = []
-                ivx = []
-                ivy = []
-                iax = []
-                iay = []
-
-                for point in self.points:
-                    ipx.append(point.p[0])
-                    ipy.append(point.p[1])
-                    im.append(point.m)
-                    ivx.append(point.v[0])
-                    ivy.append(point.v[1])
-                    iax.append(point.a[0])
-                    iay.append(point.a[1])
-                GeneratePoints(
-                    irx,
-                    iry,
-                    irm,
-                    ipx,
-                    ipy,
-                    im,
-                    ivx,
-                    ivy,
-                    iax,
-                    iay,
-                )
+    def curveDone(self, future):
+        # Runs on the worker, errors are raised again on the GUI thread
+        if not future.cancelled() and future.exception() is not None:
+            self.curve_signal.sigError.emit(future.exception())
 
-                for i in range(len(t)):
-                    r_x, r_y = RationalBezier(irx, iry,irm, t[i])
-                    self.sample_x.append(r_x)
-                    self.sample_y.append(r_y)
+    def curveFailed(self, error):
+        raise error
 
+    def applyCurve(self, generation, x, y):
+        if generation != self.curve_generation:
+            return
+        self.sample_x = x
+        self.sample_y = y
         self.curve_plot.setData(self.sample_x, self.sample_y)
 
     def massValueUpdate(self, index, value):
-        self.points[index].m = value
-        self.refresh()
+        if self.syncing:
+            return
+        self.markLabels(index)
+        self.model.setMass(index, value)
+        self.requestRefresh()
 
     def pointValueUpdate(self, index, type, value):
-        self.points[index].p[type] = value
-        self.refresh()
+        if self.syncing:
+            return
+        self.invalidateHits()
+        self.markLabels(index)
+        self.model.setPosition(index, type, value)
+        self.requestRefresh()
 
     def velValueUpdate(self, index, type, value):
-        if self.points[index].v is None:
-            self.points[index].v = [0, 0]
-        self.points[index].v[type] = value
-        self.refresh()
+        if self.syncing:
+            return
+        self.invalidateHits()
+        self.markLabels(index)
+        self.model.setHandle(index, SelectionType.VEL, type, value)
+        self.requestRefresh()
 
     def accValueUpdate(self, index, type, value):
-        if self.points[index].a is None:
-            self.points[index].a = [0, 0]
-            if self.points[index].v is None:
-                self.points[index].v = [0, 0]
-                self.point_details_list[index].velValueUpdate(0, None)
-        self.points[index].a[type] = value
-        self.refresh()
+        if self.syncing:
+            return
+        self.invalidateHits()
+        self.markLabels(index)
+        if self.model.setHandle(index, SelectionType.ACC, type, value):
+            # The new zero velocity shows up in the row
+            self.syncPointDetails(index)
+        self.requestRefresh()
 
     def SwapUp(self, index):
         if index == 0:
             return
 
-        self.points[index - 1], self.points[index] = (
-            self.points[index],
-            self.points[index - 1],
-        )
-        d1 = self.point_details_list[index]
-        d2 = self.point_details_list[index - 1]
-        p1 = self.points[index]
-        p2 = self.points[index - 1]
-
-        d1.massValueUpdate(p1.m)
-        d1.pointValueUpdate(0, p1.p[0])
-        d1.pointValueUpdate(1, p1.p[1])
-        if p1.v is not None:
-            d1.velValueUpdate(0, p1.v[0])
-            d1.velValueUpdate(1, p1.v[1])
-        else:
-            d1.velValueUpdate(0, None)
-        if p1.a is not None:
-            d1.accValueUpdate(0, p1.a[0])
-            d1.accValueUpdate(1, p1.a[1])
-        else:
-            d1.accValueUpdate(0, None)
-
-        d2.massValueUpdate(p2.m)
-        d2.pointValueUpdate(0, p2.p[0])
-        d2.pointValueUpdate(1, p2.p[1])
-        if p2.v is not None:
-            d2.velValueUpdate(0, p2.v[0])
-            d2.velValueUpdate(1, p2.v[1])
-        else:
-            d2.velValueUpdate(0, None)
-        if p2.a is not None:
-            d2.accValueUpdate(0, p2.a[0])
-            d2.accValueUpdate(1, p2.a[1])
-        else:
-            d2.accValueUpdate(0, None)
+        self.model.swap(index - 1, index)
+        self.syncPointDetails(index)
+        self.syncPointDetails(index - 1)
+        self.invalidateHits()
+        self.markLabels(index - 1, index)
+        self.refresh()
 
     def SwapDown(self, index):
         if index == len(self.points) - 1:
             return
 
-        self.points[index + 1], self.points[index] = (
-            self.points[index],
-            self.points[index + 1],
-        )
-        d1 = self.point_details_list[index]
-        d2 = self.point_details_list[index + 1]
-        p1 = self.points[index]
-        p2 = self.points[index + 1]
-
-        d1.massValueUpdate(p1.m)
-        d1.pointValueUpdate(0, p1.p[0])
-        d1.pointValueUpdate(1, p1.p[1])
-        if p1.v is not None:
-            d1.velValueUpdate(0, p1.v[0])
-            d1.velValueUpdate(1, p1.v[1])
-        else:
-            d1.velValueUpdate(0, None)
-        if p1.a is not None:
-            d1.accValueUpdate(0, p1.a[0])
-            d1.accValueUpdate(1, p1.a[1])
-        else:
-            d1.accValueUpdate(0, None)
-
-        d2.massValueUpdate(p2.m)
-        d2.pointValueUpdate(0, p2.p[0])
-        d2.pointValueUpdate(1, p2.p[1])
-        if p2.v is not None:
-            d2.velValueUpdate(0, p2.v[0])
-            d2.velValueUpdate(1, p2.v[1])
-        else:
-            d2.velValueUpdate(0, None)
-        if p2.a is not None:
-            d2.accValueUpdate(0, p2.a[0])
-            d2.accValueUpdate(1, p2.a[1])
-        else:
-            d2.accValueUpdate(0, None)
+        self.model.swap(index + 1, index)
+        self.syncPointDetails(index)
+        self.syncPointDetails(index + 1)
+        self.invalidateHits()
+        self.markLabels(index, index + 1)
+        self.refresh()
@@ -0,0 +1,355 @@
+"""
+Point state and curve evaluation without Qt, GraphContext is a view over it.
+
+InterpolationModel
+    points - PointStore of points, velocities, accelerations and masses
+    add - Append a batch of points, clamping handles to 5 units
+    addHandle - Give a point its velocity, then its acceleration
+    move - Drag a point, velocity or acceleration handle
+    setPosition, setHandle, setMass - Edit one value, as the point details sliders do
+    delete - Remove a point, or its velocity or acceleration
+    swap - Exchange two points
+    setInterpolationType - Switch curve type, dropping cached Bezier generation
+    update - Regenerate Bezier handles and control polygon, rebuild the interpolant
+    changedFrom - First point whose generated Bezier handles the last update changed
+    snapshot - Copy of everything evaluate reads
+    evaluate - Sample the curve, safe to run off the main thread
+CurveSnapshot - Immutable input to InterpolationModel.evaluate
+"""
+import enum
+import numpy as np
+from Math import *
+from PointStore import *
+
+
+class SelectionType(enum.Enum):
+    POINT = 1
+    VEL = 2
+    ACC = 3
+
+
+class InterpolationType(enum.Enum):
+    NEWTON = 1
+    BEZIER = 2
+    HERMITE = 3
+    LAGRANGE = 4
+
+
+class CurveSnapshot:
+    """
+    Copy of everything evaluate reads, so a worker never sees a point
+    being edited on the GUI thread
+    """
+
+    def __init__(self, model):
+        n = len(model.points)
+        self.interpolation_type = model.interpolation_type
+        self.interpolant = (
+            np.array(model.interpolant[0], dtype=float),
+            np.array(model.interpolant[1], dtype=float),
+        )
+        self.mass = np.array(model.mass, dtype=float)
+        self.use_gen_point = model.use_gen_point
+        self.control = tuple(np.array(c, dtype=float) for c in model.control)
+        self.positions = model.points.positions[:n].copy()
+        self.velocities = model.points.velocities[:n].copy()
+        self.accelerations = model.points.accelerations[:n].copy()
+        self.masses = model.points.masses[:n].copy()
+        self.has_vel = model.points.has_vel[:n].copy()
+        self.has_acc = model.points.has_acc[:n].copy()
+        self.adaptive_sample = model.adaptive_sample
+        self.pixel_size = model.pixel_size
+        self.sample_tolerance = model.sample_tolerance
+        self.sample_budget = model.sample_budget
+        self.sample_count = model.sample_count
+        self.use_de_casteljau = model.use_de_casteljau
+        self.lagrange_chebyshev = model.lagrange_chebyshev
+
+
+class InterpolationModel:
+    def __init__(self, interpolation_type=InterpolationType.BEZIER):
+        self.points = PointStore()
+        self.interpolation_type = interpolation_type
+        self.interpolant = [], []
+        self.mass = []
+        self.use_gen_point = False
+        self.control = np.empty(0), np.empty(0), np.empty(0)
+
+        # Curve caches, reused between evaluations
+        self.newton = NewtonTable()
+        self.hermite = HermiteSpline()
+        self.lagrange = BarycentricLagrange()
+        self.de_casteljau = DeCasteljauBatch()
+        self.chain = BezierChain()
+
+        # Sampling, pixel_size is set by the view and enables adaptive sampling
+        self.sample_count = 500
+        self.adaptive_sample = True
+        self.sample_tolerance = 0.5
+        self.sample_budget = 4096
+        self.pixel_size = None
+        # Bezier curves use the cached bernstein basis, DeCasteljauBatch is
+        # slower and uncached but also handles degrees past BernsteinMaxDegree
+        self.use_de_casteljau = False
+        # Lagrange nodes are chebyshev spaced instead of one per integer
+        self.lagrange_chebyshev = False
+
+    def __len__(self):
+        return len(self.points)
+
+    def clear(self):
+        self.points.clear()
+        self.interpolant = [], []
+        self.mass = []
+        self.use_gen_point = False
+        self.control = np.empty(0), np.empty(0), np.empty(0)
+        self.chain.clear()
+
+    def setInterpolationType(self, interpolation_type):
+        # Generated Bezier handles stay on the points as ordinary handles.
+        # Bezier only lets the first point hold handles, any others would
+        # drop their point from the interpolant and could not be deleted
+        self.interpolation_type = interpolation_type
+        self.use_gen_point = False
+        self.control = np.empty(0), np.empty(0), np.empty(0)
+        self.chain.clear()
+        if interpolation_type == InterpolationType.BEZIER:
+            n = len(self.points)
+            self.points.has_vel[1:n] = False
+            self.points.has_acc[1:n] = False
+
+    def hasDerivatives(self, index):
+        # Bezier handles are only edited on the first point, the rest are generated
+        return self.interpolation_type != InterpolationType.BEZIER or index == 0
+
+    def add(
+        self,
+        positions,
+        velocities=None,
+        accelerations=None,
+        masses=None,
+        has_vel=None,
+        has_acc=None,
+        limit=5.0,
+    ):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        n = len(positions)
+        if has_vel is None:
+            has_vel = np.full(n, velocities is not None)
+        if has_acc is None:
+            has_acc = np.full(n, accelerations is not None)
+        velocities = np.zeros((n, 2)) if velocities is None else velocities
+        accelerations = np.zeros((n, 2)) if accelerations is None else accelerations
+        masses = np.ones(n) if masses is None else masses
+        if limit is not None:
+            velocities = np.clip(velocities, -limit, limit)
+            accelerations = np.clip(accelerations, -limit, limit)
+
+        start = len(self.points)
+        self.points.extend(
+            positions, velocities, accelerations, masses, has_vel, has_acc
+        )
+        return start
+
+    def addHandle(self, index, x, y):
+        point = self.points[index]
+        if point.v is None:
+            point.v = [x - point.p[0], y - point.p[1]]
+            return SelectionType.VEL
+        if point.a is None:
+            point.a = [x - point.p[0], y - point.p[1]]
+            return SelectionType.ACC
+        return None
+
+    def move(self, index, type, x, y):
+        point = self.points[index]
+        if type == SelectionType.POINT:
+            point.p[0] = x
+            point.p[1] = y
+            return True
+        if not self.hasDerivatives(index):
+            return False
+
+        # Handles stay within 5 units of their point
+        nx = clamp(x, point.p[0] - 5, point.p[0] + 5)
+        ny = clamp(y, point.p[1] - 5, point.p[1] + 5)
+        if type == SelectionType.VEL:
+            point.v[0] = nx - point.p[0]
+            point.v[1] = ny - point.p[1]
+        elif type == SelectionType.ACC:
+            point.a[0] = nx - point.p[0]
+            point.a[1] = ny - point.p[1]
+        return True
+
+    def setPosition(self, index, axis, value):
+        self.points[index].p[axis] = value
+
+    def setHandle(self, index, type, axis, value):
+        # A missing handle starts at zero, an acceleration needs a velocity.
+        # Returns whether a velocity was added along the way
+        point = self.points[index]
+        added = False
+        if point.v is None:
+            point.v = [0, 0]
+            added = type == SelectionType.ACC
+        if type == SelectionType.VEL:
+            point.v[axis] = value
+        elif type == SelectionType.ACC:
+            if point.a is None:
+                point.a = [0, 0]
+            point.a[axis] = value
+        return added
+
+    def setMass(self, index, value):
+        self.points[index].m = value
+
+    def delete(self, type, index):
+        if type == SelectionType.POINT:
+            self.points.pop(index)
+            return True
+        if not self.hasDerivatives(index):
+            return False
+        if type == SelectionType.VEL and self.points[index].a is None:
+            self.points[index].v = None
+            self.points[index].a = None
+        elif type == SelectionType.ACC:
+            self.points[index].a = None
+        return True
+
+    def swap(self, i, j):
+        self.points.swap(i, j)
+
+    def generate(self):
+        # Bezier velocities and accelerations follow from the first point's,
+        # the chain only reruns from the first point moved since last time
+        n = len(self.points)
+        if n == 0:
+            return
+        self.use_gen_point = False
+
+        if self.points[0].v is not None and self.points[0].a is not None:
+            velocities, accelerations = self.chain.sync(
+                self.points.positions[:n],
+                self.points.velocities[0],
+                self.points.accelerations[0],
+            )
+            self.points.velocities[:n] = velocities
+            self.points.accelerations[:n] = accelerations
+            self.points.has_vel[:n] = True
+            self.points.has_acc[:n] = True
+            self.control = self.chain.control(self.points.masses[:n])
+
+            self.use_gen_point = True
+
+    def update(self):
+        if self.interpolation_type == InterpolationType.BEZIER:
+            self.generate()
+            # Interpolant is the end points and every point without a velocity
+            x, y, self.mass = self.points.bezierInterpolant()
+        else:
+            # Interpolant is every point followed by its velocity and acceleration if set
+            x, y, self.mass = self.points.newtonInterpolant()
+        self.interpolant = x, y
+
+    def changedFrom(self):
+        if not self.use_gen_point:
+            return len(self.points)
+        return self.chain.changed
+
+    def snapshot(self):
+        return CurveSnapshot(self)
+
+    def evaluate(self, snapshot=None):
+        # Only touches the snapshot and the curve caches
+        if snapshot is None:
+            snapshot = self.snapshot()
+        empty = np.empty(0), np.empty(0)
+        depth = None
+        if snapshot.interpolation_type == InterpolationType.NEWTON:
+
+            # Update divided difference table, only entries touched by the
+            # edited or appended values are recomputed
+            self.newton.sync(snapshot.interpolant[0], snapshot.interpolant[1])
+
+            # Evaluate the nested newton form directly
+            curve = lambda t: (
+                NewtonHorner(self.newton.gx, t)[0],
+                NewtonHorner(self.newton.gy, t)[0],
+            )
+
+        elif snapshot.interpolation_type == InterpolationType.LAGRANGE:
+
+            # Weights only depend on the point count, t is spread over the nodes
+            n = len(snapshot.positions)
+            if self.lagrange.chebyshev != snapshot.lagrange_chebyshev:
+                self.lagrange = BarycentricLagrange(snapshot.lagrange_chebyshev)
+            self.lagrange.resize(n)
+            if n < 2:
+                return empty
+            lx = snapshot.positions[:, 0]
+            ly = snapshot.positions[:, 1]
+            curve = lambda t: self.lagrange.evaluate(lx, ly, t * (n - 1))
+
+        elif snapshot.interpolation_type == InterpolationType.HERMITE:
+
+            if len(snapshot.positions) < 2:
+                return empty
+            if snapshot.adaptive_sample and snapshot.pixel_size is not None:
+                self.hermite.adapt(
+                    snapshot.pixel_size[0],
+                    snapshot.pixel_size[1],
+                    snapshot.sample_tolerance,
+                    snapshot.sample_budget,
+                )
+            else:
+                # sample_count is shared out between the segments
+                n = len(snapshot.positions)
+                self.hermite.resample(max(2, -(-snapshot.sample_count // (n - 1))))
+
+            # Piecewise segments, each sampled on its own so only the ones
+            # next to an edited point are resampled
+            x, y = self.hermite.sync(
+                snapshot.positions,
+                snapshot.velocities,
+                snapshot.accelerations,
+                snapshot.has_vel,
+                snapshot.has_acc,
+            )
+            return x.copy(), y.copy()
+
+        elif snapshot.interpolation_type == InterpolationType.BEZIER:
+
+            if snapshot.use_gen_point == False:
+                px, py, m = snapshot.interpolant[0], snapshot.interpolant[1], snapshot.mass
+
+            else:
+                px, py, m = snapshot.control
+            if len(px) < 2:
+                return empty
+
+            de_casteljau = snapshot.use_de_casteljau or len(px) - 1 > BernsteinMaxDegree
+            if de_casteljau:
+                ## Rational DeCasteljau
+                curve = lambda t: self.de_casteljau.evaluate(px, py, m, t)
+            else:
+                ## Rational Bezier, adaptive t stays on the grid the cached basis covers
+                curve = lambda t: RationalBezierGrid(px, py, m, t)
+                depth = BezierGridDepth
+
+        if snapshot.adaptive_sample and snapshot.pixel_size is not None:
+            # Subdivide until the chord error is under sample_tolerance pixels
+            _, x, y = AdaptiveSample(
+                curve,
+                snapshot.pixel_size[0],
+                snapshot.pixel_size[1],
+                snapshot.sample_tolerance,
+                budget=snapshot.sample_budget,
+                depth=depth,
+            )
+            return x, y
+        elif (
+            snapshot.interpolation_type == InterpolationType.BEZIER
+            and not de_casteljau
+        ):
+            return RationalBezierSamples(px, py, m, snapshot.sample_count)
+        return curve(np.linspace(0, 1, num=snapshot.sample_count))
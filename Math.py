@@ -1,8 +1,48 @@
 from itertools import zip_longest
+from functools import lru_cache
+import numpy as np
 
 def clamp(n, smallest, largest): 
     return max(smallest, min(n, largest))
 
+def AdaptiveSample(
+    curve, scale_x, scale_y, tolerance=0.5, initial=33, budget=4096, depth=None
+):
+    # Subdivide t until the midpoint of every interval is within tolerance
+    # (in pixels) of its chord, or the sample budget is spent. With depth set
+    # an interval is halved at most depth times, so t stays on the grid
+    # k / ((initial - 1) * 2**depth)
+    t = np.linspace(0, 1, num=initial)
+    x, y = curve(t)
+    active = np.ones(len(t) - 1, dtype=bool)
+    while active.any() and len(t) < budget:
+        index = np.nonzero(active)[0]
+        if depth is not None:
+            index = index[t[index + 1] - t[index] > 1.5 / ((initial - 1) << depth)]
+            if not len(index):
+                break
+        mid = (t[index] + t[index + 1]) / 2
+        mx, my = curve(mid)
+        error = np.hypot(
+            (mx - (x[index] + x[index + 1]) / 2) / scale_x,
+            (my - (y[index] + y[index + 1]) / 2) / scale_y,
+        )
+        split = error > tolerance
+        room = budget - len(t)
+        if split.sum() > room:
+            split[np.argsort(error)[:len(error) - room]] = False
+
+        index = index[split]
+        t = np.insert(t, index + 1, mid[split])
+        x = np.insert(x, index + 1, mx[split])
+        y = np.insert(y, index + 1, my[split])
+
+        position = index + np.arange(len(index))
+        active = np.zeros(len(t) - 1, dtype=bool)
+        active[position] = True
+        active[position + 1] = True
+    return t, x, y
+
 def PolyMultiply(p1, p2):
     result_coeffs = [0] * (len(p1) + len(p2) - 1)
     for index1, coeff1 in enumerate(p1):
@@ -25,28 +65,385 @@ def PolyValue(x, coeffs):
         y += coeffs[i] * x ** i
     return y
 
+def PolyHorner(coeffs, t):
+    t = np.asarray(t, dtype=float)
+    y = np.zeros_like(t)
+    dy = np.zeros_like(t)
+    ddy = np.zeros_like(t)
+    for c in reversed(coeffs):
+        ddy *= t
+        ddy += 2 * dy
+        dy *= t
+        dy += y
+        y *= t
+        y += c
+    return y, dy, ddy
+
 def NewtonFrom(g):
-    p = []
-    #test = []
+    p = [0] * len(g)
+    basis = [1]
     for i in range(len(g)):
-        temp = [1]
-        for j in range(i):
-            temp = PolyMultiply(temp, [-j, 1])
-        p = PolyAdd(p, PolyScale(temp, g[i][0]))
-        #test.append(p[i])
-        #print("p value: ", p[i], ", i value: ", i)
-    #print("p",p)
-    #return test
+        for k in range(len(basis)):
+            p[k] += basis[k] * g[i][0]
+        # basis *= (t - i), reusing the previous product
+        basis.append(0)
+        for k in range(len(basis) - 1, 0, -1):
+            basis[k] = basis[k-1] - i * basis[k]
+        basis[0] *= -i
     return p
 
+def NewtonHorner(g, t):
+    t = np.asarray(t, dtype=float)
+    y = np.zeros_like(t)
+    dy = np.zeros_like(t)
+    ddy = np.zeros_like(t)
+    s = np.empty_like(t)
+    for i in reversed(range(len(g))):
+        np.subtract(t, i, out=s)
+        ddy *= s
+        ddy += 2 * dy
+        dy *= s
+        dy += y
+        y *= s
+        y += g[i][0]
+    return y, dy, ddy
+
+"""
+Newton Interpolation:
+NewtonTable - Divided difference table kept between refreshes
+    append - Add one value, extending every row by one entry
+    move - Change one value, recomputing only the entries that depend on it
+    truncate - Drop every value from an index onwards
+    sync - Bring the table in line with a list of values using the above
+NewtonFrom - Expand the table into monomial coefficients
+NewtonHorner - Evaluate the nested newton form for every t in an array
+"""
+
+class NewtonTable:
+    def __init__(self):
+        self.gx = []
+        self.gy = []
+
+    def __len__(self):
+        return len(self.gx[0]) if self.gx else 0
+
+    def clear(self):
+        self.gx.clear()
+        self.gy.clear()
+
+    def append(self, x, y):
+        n = len(self)
+        self.gx.append([])
+        self.gy.append([])
+        self.gx[0].append(x)
+        self.gy[0].append(y)
+        for i in range(1, n + 1):
+            self.gx[i].append((self.gx[i-1][-1] - self.gx[i-1][-2]) / i)
+            self.gy[i].append((self.gy[i-1][-1] - self.gy[i-1][-2]) / i)
+
+    def move(self, k, x, y):
+        n = len(self)
+        self.gx[0][k] = x
+        self.gy[0][k] = y
+        for i in range(1, n):
+            for j in range(max(0, k - i), min(k, n - 1 - i) + 1):
+                self.gx[i][j] = (self.gx[i-1][j+1] - self.gx[i-1][j]) / i
+                self.gy[i][j] = (self.gy[i-1][j+1] - self.gy[i-1][j]) / i
+
+    def truncate(self, m):
+        del self.gx[m:]
+        del self.gy[m:]
+        for i in range(m):
+            del self.gx[i][m-i:]
+            del self.gy[i][m-i:]
+
+    def sync(self, xs, ys):
+        n = min(len(self), len(xs))
+        changed = [
+            k for k in range(n) if xs[k] != self.gx[0][k] or ys[k] != self.gy[0][k]
+        ]
+        if len(changed) == 1 and len(xs) >= len(self):
+            self.move(changed[0], xs[changed[0]], ys[changed[0]])
+        else:
+            self.truncate(changed[0] if changed else n)
+        for k in range(len(self), len(xs)):
+            self.append(xs[k], ys[k])
+
+"""
+Lagrange Interpolation:
+ChebyshevNodes - Chebyshev points of the second kind over [a, b]
+BarycentricLagrange - Second form barycentric interpolant over a set of nodes
+    reset - Compute every weight from scratch in O(n^2)
+    normalize - Rescale the weights so the largest is 1, log_scale keeps the factor
+    add - Add a node, updating the weights in O(n)
+    remove - Remove a node, updating the weights in O(n)
+    resize - Nodes for n points, integer or chebyshev spaced over [0, n-1]
+    evaluate - Interpolate values at every t in an array
+"""
+
+def ChebyshevNodes(n:int, a, b):
+    if n == 1:
+        return np.array([(a + b) / 2])
+    return a + (b - a) * (1 - np.cos(np.pi * np.arange(n) / (n - 1))) / 2
+
+class BarycentricLagrange:
+    def __init__(self, chebyshev=False):
+        self.chebyshev = chebyshev
+        self.nodes = np.empty(0)
+        self.weights = np.empty(0)
+        self.log_scale = 0.0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def normalize(self, weights, log_scale=0.0):
+        # Weights only matter up to a common factor, keep the largest at 1 so
+        # equispaced nodes do not overflow or underflow at large n
+        peak = np.abs(weights).max() if len(weights) else 1.0
+        self.weights = weights / peak
+        self.log_scale = log_scale + np.log(peak)
+
+    def reset(self, nodes):
+        self.nodes = np.asarray(nodes, dtype=float)
+        diff = self.nodes[:, None] - self.nodes[None, :]
+        np.fill_diagonal(diff, 1.0)
+        # w_j = 1 / prod(x_j - x_i), summed in log space
+        log = -np.log(np.abs(diff)).sum(axis=1)
+        sign = np.prod(np.sign(diff), axis=1)
+        top = log.max() if len(log) else 0.0
+        self.normalize(sign * np.exp(log - top), top)
+
+    def add(self, node):
+        diff = self.nodes - node
+        log = -np.log(np.abs(diff)).sum() - self.log_scale
+        sign = np.prod(np.sign(-diff))
+        weights = self.weights / diff
+        top = max(np.log(np.abs(weights).max()) if len(weights) else log, log)
+        self.normalize(
+            np.append(weights * np.exp(-top), sign * np.exp(log - top)),
+            self.log_scale + top,
+        )
+        self.nodes = np.append(self.nodes, node)
+
+    def remove(self, index):
+        weights = self.weights * (self.nodes - self.nodes[index])
+        self.nodes = np.delete(self.nodes, index)
+        self.normalize(np.delete(weights, index), self.log_scale)
+
+    def resize(self, n:int):
+        if self.chebyshev:
+            if n != len(self):
+                # closed form weights, (-1)^j halved at both ends
+                self.nodes = ChebyshevNodes(n, 0, n - 1) if n else np.empty(0)
+                self.weights = (-1.0) ** np.arange(n)
+                if n >= 2:
+                    self.weights[[0, -1]] *= 0.5
+                self.log_scale = 0.0
+            return
+        if len(self) and self.nodes[-1] != len(self) - 1:
+            self.reset(np.arange(len(self)))
+        while len(self) < n:
+            self.add(len(self))
+        while len(self) > n:
+            self.remove(len(self) - 1)
+
+    def evaluate(self, vx, vy, t):
+        t = np.asarray(t, dtype=float)
+        diff = t[:, None] - self.nodes[None, :]
+        exact = diff == 0
+        diff[exact] = 1.0
+        c = self.weights / diff
+        c[exact.any(axis=1)] = 0.0
+        c[exact] = 1.0
+        denom = c.sum(axis=1)
+        return c @ np.asarray(vx, dtype=float) / denom, c @ np.asarray(vy, dtype=float) / denom
+
+"""
+Hermite Interpolation:
+HermiteBasis - Cubic (4 column) or quintic (6 column) hermite basis over an evenly spaced u grid
+HermiteBasisAt - The same basis at arbitrary u
+HermiteSpline - Piecewise hermite curve with one sampled segment between each pair of points
+    tangent - Velocity of a point, estimated from its neighbours when not set
+    segment - Sample one segment, quintic when either end has an acceleration
+    sync - Resample only the segments next to points that changed, the returned arrays are reused
+    resample - Sample every segment at a fixed count, resampling everything on the next sync
+    adapt - Sample every segment adaptively in pixels, resampling everything on the next sync
+"""
+
+@lru_cache(maxsize=8)
+def HermiteBasis(samples:int, quintic:bool):
+    basis = HermiteBasisAt(np.linspace(0, 1, num=samples), quintic)
+    basis.setflags(write=False)
+    return basis
+
+def HermiteBasisAt(u, quintic:bool):
+    u = np.asarray(u, dtype=float)[:, None]
+    if quintic:
+        # p0, v0, a0, a1, v1, p1
+        basis = np.hstack((
+            1 - 10*u**3 + 15*u**4 - 6*u**5,
+            u - 6*u**3 + 8*u**4 - 3*u**5,
+            0.5*u**2 - 1.5*u**3 + 1.5*u**4 - 0.5*u**5,
+            0.5*u**3 - u**4 + 0.5*u**5,
+            -4*u**3 + 7*u**4 - 3*u**5,
+            10*u**3 - 15*u**4 + 6*u**5,
+        ))
+    else:
+        # p0, v0, v1, p1
+        basis = np.hstack((
+            2*u**3 - 3*u**2 + 1,
+            u**3 - 2*u**2 + u,
+            u**3 - u**2,
+            -2*u**3 + 3*u**2,
+        ))
+    return basis
+
+class HermiteSpline:
+    def __init__(self, samples=32):
+        self.samples = samples
+        # (scale_x, scale_y, tolerance, budget) when sampling adaptively
+        self.adaptive = None
+        self.segment_budget = None
+        # one row per point: px, py, vx, vy, ax, ay, has velocity, has acceleration
+        self.state = np.empty((0, 8))
+        # (x, y) samples of each segment, both ends included, and where each
+        # segment starts in the joined x, y
+        self.parts = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+
+    def clear(self):
+        self.state = np.empty((0, 8))
+        self.parts = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+
+    def resample(self, samples:int):
+        if self.adaptive is not None or samples != self.samples:
+            self.samples = samples
+            self.adaptive = None
+            self.clear()
+
+    def adapt(self, scale_x, scale_y, tolerance, budget):
+        adaptive = (scale_x, scale_y, tolerance, budget)
+        if adaptive != self.adaptive:
+            self.adaptive = adaptive
+            self.clear()
+
+    def tangent(self, state, i):
+        if state[i, 6]:
+            return state[i, 2:4]
+        before = state[max(i - 1, 0), 0:2]
+        after = state[min(i + 1, len(state) - 1), 0:2]
+        scale = 0.5 if 0 < i < len(state) - 1 else 1.0
+        return (after - before) * scale
+
+    def segment(self, state, i):
+        p0 = state[i, 0:2]
+        p1 = state[i + 1, 0:2]
+        v0 = self.tangent(state, i)
+        v1 = self.tangent(state, i + 1)
+        quintic = bool(state[i, 7] or state[i + 1, 7])
+        if not quintic:
+            control = np.array((p0, v0, v1, p1))
+        else:
+            # missing accelerations are stored as zero
+            control = np.array((p0, v0, state[i, 4:6], state[i + 1, 4:6], v1, p1))
+
+        if self.adaptive is None:
+            sample = HermiteBasis(self.samples, quintic) @ control
+            return sample[:, 0].copy(), sample[:, 1].copy()
+
+        # Both ends are always kept, so every point lies on the polyline
+        scale_x, scale_y, tolerance, _ = self.adaptive
+        budget = self.segment_budget
+        _, x, y = AdaptiveSample(
+            lambda u: tuple((HermiteBasisAt(u, quintic) @ control).T),
+            scale_x,
+            scale_y,
+            tolerance,
+            initial=min(5, budget),
+            budget=budget,
+        )
+        return x, y
+
+    def sync(self, positions, velocities, accelerations, has_vel, has_acc):
+        state = np.hstack((
+            positions,
+            velocities * has_vel[:, None],
+            accelerations * has_acc[:, None],
+            has_vel[:, None],
+            has_acc[:, None],
+        ))
+        n = len(state)
+        if self.adaptive is not None:
+            # The sample budget is shared out between the segments
+            budget = max(self.adaptive[3] // max(n - 1, 1), 2)
+            if budget != self.segment_budget:
+                self.segment_budget = budget
+                self.clear()
+
+        common = min(n, len(self.state))
+        changed = np.nonzero((state[:common] != self.state[:common]).any(axis=1))[0]
+        dirty = set()
+        if n != len(self.state):
+            first = changed[0] if len(changed) else common
+            first = max(first - 2, 0)
+            del self.parts[first:]
+            self.parts.extend([None] * max(n - 1 - len(self.parts), 0))
+            dirty.update(range(first, n - 1))
+        else:
+            for i in changed:
+                # estimated tangents reach one point further either side
+                dirty.update(range(max(i - 2, 0), min(i + 2, n - 1)))
+
+        resized = n != len(self.state)
+        self.state = state
+        sampled = {i: self.segment(state, i) for i in dirty}
+        for i, part in sampled.items():
+            self.parts[i] = part
+        offsets = self.offsets
+        if not resized and all(
+            len(part[0]) == offsets[i + 1] - offsets[i] for i, part in sampled.items()
+        ):
+            # Same sample counts, write the new segments over the old ones
+            for i, (x, y) in sampled.items():
+                self.x[offsets[i]:offsets[i + 1]] = x
+                self.y[offsets[i]:offsets[i + 1]] = y
+        elif self.parts:
+            sizes = [len(part[0]) for part in self.parts]
+            self.offsets = np.concatenate(([0], np.cumsum(sizes)))
+            self.x = np.concatenate([part[0] for part in self.parts])
+            self.y = np.concatenate([part[1] for part in self.parts])
+        else:
+            self.clear()
+            self.state = state
+        return self.x, self.y
+
 """
 Bezier Interpolation:
 Binomial - Build binomial term for Bezier and RationalBezier
 Bezier - Build Bezier Curve using bernstein
 RationalBezier - Build Rational Bezier Curve using bernstein
+BernsteinBasis - Build bernstein basis matrix for every t in an array
+RationalBezierBatch - Build Rational Bezier Curve for every t in an array
+BernsteinSamples - Cached bernstein basis matrix over an evenly spaced t grid
+RationalBezierSamples - Build Rational Bezier Curve using the cached basis matrix
+BernsteinMidpoints - Cached bernstein basis matrix at the midpoints of an evenly spaced t grid
+RationalBezierGrid - Build Rational Bezier Curve at AdaptiveSample's dyadic t from the cached basis matrices
+BasisCacheInfo - Hit/miss counters of the uniform and midpoint bernstein basis caches
+BernsteinMaxDegree - Highest degree the bernstein basis is used for, its binomials overflow a float past ~1029
 
 DeCasteljau - Build Bezier Curve using using DeCasteljau
 RationalDeCasteljau - Build Bezier Curve using DeCasteljau
+DeCasteljauBatch - Build Rational Bezier Curve using DeCasteljau for every t in an array
+    run - Every level in place on a (3, n, chunk) buffer of homogeneous points, keeping
+          the last two levels for tangent or every level's end points for subdivide
+    evaluate - Curve at every t
+    tangent - First derivative at every t from the last two levels
+    subdivide - Control polygons of the curve split at t
 """
 
 tri = [      [1],                          #n=0
@@ -94,6 +491,62 @@ def RationalBezier(px:list,py:list,m:list,t:float):
         sum_y += py[k] * func
     return sum_x/basis, sum_y/basis 
 
+def BernsteinBasis(n:int, t):
+    Binomial(n,0)
+    k = np.arange(n+1)
+    t = np.asarray(t, dtype=float)[:, None]
+    return np.array(tri[n], dtype=float) * (1-t)**(n-k) * t**k
+
+def RationalBezierBatch(px, py, m, t):
+    basis = BernsteinBasis(len(px)-1, t) * np.asarray(m, dtype=float)
+    weight = basis.sum(axis=1)
+    return basis @ np.asarray(px, dtype=float) / weight, basis @ np.asarray(py, dtype=float) / weight
+
+@lru_cache(maxsize=32)
+def BernsteinSamples(n:int, samples:int):
+    basis = BernsteinBasis(n, np.linspace(0, 1, num=samples))
+    basis.setflags(write=False)
+    return basis
+
+def RationalBezierSamples(px, py, m, samples:int):
+    basis = BernsteinSamples(len(px)-1, samples)
+    m = np.asarray(m, dtype=float)
+    weight = basis @ m
+    return basis @ (m * px) / weight, basis @ (m * py) / weight
+
+@lru_cache(maxsize=16)
+def BernsteinMidpoints(n:int, intervals:int):
+    basis = BernsteinBasis(n, (2*np.arange(intervals) + 1) / (2*intervals))
+    basis.setflags(write=False)
+    return basis
+
+BezierGridDepth = 6
+
+def RationalBezierGrid(px, py, m, t, initial=33, depth=BezierGridDepth):
+    # t is k / ((initial-1) * 2**depth), as AdaptiveSample produces with the
+    # same initial and depth. k on the initial grid reads BernsteinSamples, a k
+    # first reached by the level-th halving reads that level's midpoints
+    n = len(px)-1
+    k = np.rint(np.asarray(t, dtype=float) * ((initial-1) << depth)).astype(np.int64)
+    basis = np.empty((len(k), n+1))
+    coarse = k % (1 << depth) == 0
+    if coarse.any():
+        basis[coarse] = BernsteinSamples(n, initial)[k[coarse] >> depth]
+    for level in range(1, depth+1):
+        shift = depth - level
+        rows = ((k >> shift) & 1 == 1) & (k % (1 << shift) == 0)
+        if rows.any():
+            midpoints = BernsteinMidpoints(n, (initial-1) << (level-1))
+            basis[rows] = midpoints[k[rows] >> (shift+1)]
+    basis *= np.asarray(m, dtype=float)
+    weight = basis.sum(axis=1)
+    return basis @ np.asarray(px, dtype=float) / weight, basis @ np.asarray(py, dtype=float) / weight
+
+def BasisCacheInfo():
+    return BernsteinSamples.cache_info(), BernsteinMidpoints.cache_info()
+
+BernsteinMaxDegree = 1000
+
 def DeCasteljau(rx:list,ry:list,px:list,py:list,t:float):
   if len(px) == 1:
     rx.append(px[0])
@@ -121,6 +574,90 @@ def RationalDeCasteljau(rx:list,ry:list,px:list,py:list,m:list,t:float):
     del m[-1]
     RationalDeCasteljau(rx,ry,px,py,m,t)
 
+class DeCasteljauBatch:
+    def __init__(self, chunk=32):
+        # t is processed chunk samples at a time so a level stays in cache
+        self.chunk = chunk
+        self.buffer = np.empty(0)
+        self.temp = np.empty(0)
+
+    def reserve(self, size):
+        if size > len(self.buffer):
+            size = max(size, 2 * len(self.buffer))
+            self.buffer = np.empty(size)
+            self.temp = np.empty(size)
+
+    def run(self, px, py, m, t, tangent=False, split=False):
+        t = np.asarray(t, dtype=float)
+        n = len(px)
+        samples = len(t)
+        m = np.asarray(m, dtype=float)
+        start = np.array((np.asarray(px, dtype=float) * m, np.asarray(py, dtype=float) * m, m))
+        start = start[:, :, None]
+
+        h = np.empty((3, samples))
+        q = np.empty((2, 3, samples)) if tangent else None
+        left = np.empty((3, n)) if split else None
+        right = np.empty((3, n)) if split else None
+
+        chunk = max(min(self.chunk, samples), 1)
+        self.reserve(3 * n * chunk)
+        for c in range(0, samples, chunk):
+            tc = t[c:c + chunk]
+            k = len(tc)
+            b = self.buffer[:3 * n * k].reshape(3, n, k)
+            b[...] = start
+            if split:
+                left[:, 0] = b[:, 0, 0]
+                right[:, 0] = b[:, n-1, 0]
+            for r in range(1, n):
+                if tangent and r == n - 1:
+                    q[0, :, c:c + k] = b[:, 0]
+                    q[1, :, c:c + k] = b[:, 1]
+                lo = b[:, :n-r]
+                temp = self.temp[:3 * (n-r) * k].reshape(3, n-r, k)
+                np.subtract(b[:, 1:n-r+1], lo, out=temp)
+                temp *= tc
+                lo += temp
+                if split:
+                    left[:, r] = b[:, 0, 0]
+                    right[:, r] = b[:, n-1-r, 0]
+            h[:, c:c + k] = b[:, 0]
+        return h, q, left, right
+
+    def evaluate(self, px, py, m, t):
+        h, _, _, _ = self.run(px, py, m, t)
+        np.divide(h[:2], h[2], out=h[:2])
+        return h[0], h[1]
+
+    def tangent(self, px, py, m, t):
+        samples = len(np.asarray(t))
+        d = len(px) - 1
+        if d < 1:
+            return np.zeros(samples), np.zeros(samples)
+        h, (q0, q1), _, _ = self.run(px, py, m, t, tangent=True)
+        dh = d * (q1 - q0)
+        w2 = h[2] * h[2]
+        return (dh[0] * h[2] - h[0] * dh[2]) / w2, (dh[1] * h[2] - h[1] * dh[2]) / w2
+
+    def subdivide(self, px, py, m, t:float):
+        _, _, left, right = self.run(px, py, m, [t], split=True)
+        right = right[:, ::-1]
+        return (
+            (left[0] / left[2], left[1] / left[2], left[2].copy()),
+            (right[0] / right[2], right[1] / right[2], right[2].copy()),
+        )
+
+"""
+Bezier Generation:
+GenerateVelocity, GenerateAcceleration, GenerateC1C2 - One step of the handle chain
+GeneratePoints - Expand points and handles into the control polygon
+GenerateVelocityAccelerations - Run the handle chain from the first point's velocity and acceleration
+BezierChain - GenerateVelocityAccelerations and GeneratePoints kept between refreshes
+    sync - Rerun the chain from the first edited point onwards
+    control - Control polygon (px, py, m) arrays for the synced chain
+"""
+
 def GenerateVelocity(px,py,cx,cy):
     return 3*(cx-px), 3*(cy-py)
 
@@ -175,4 +712,99 @@ def GenerateVelocityAccelerations(rvx,rvy,rax,ray,px,py,vx,vy,ax,ay):
     vx = (vx / pvx) if pvx >0 else vx
     vy = (vy / pvy) if pvy >0 else vy
     ax = (ax / pax) if pax >0 else ax
-    ay = (ay / pay) if pay >0 else ay
\ No newline at end of file
+    ay = (ay / pay) if pay >0 else ay
+
+
+class BezierChain:
+    def __init__(self):
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.accelerations = np.zeros((0, 2))
+        self.points = np.zeros((0, 2))
+        self.start = None
+        self.changed = 0
+
+    def clear(self):
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.accelerations = np.zeros((0, 2))
+        self.points = np.zeros((0, 2))
+        self.start = None
+        self.changed = 0
+
+    def resize(self, n):
+        for name, rows in (
+            ("positions", n),
+            ("velocities", n),
+            ("accelerations", n),
+            ("points", max(3 * n - 2, 0)),
+        ):
+            old = getattr(self, name)
+            new = np.zeros((rows, 2))
+            keep = min(rows, len(old))
+            new[:keep] = old[:keep]
+            setattr(self, name, new)
+
+    def sync(self, positions, v0, a0):
+        n = len(positions)
+        m = len(self.positions)
+        start = float(v0[0]), float(v0[1]), float(a0[0]), float(a0[1])
+
+        # Step i only depends on step i-1 and points i-1 and i, so everything
+        # before the first moved point is still valid
+        common = min(n, m)
+        moved = np.nonzero(np.any(positions[:common] != self.positions[:common], axis=1))[0]
+        first = int(moved[0]) if len(moved) else common
+        step = 0 if start != self.start else max(first, 1)
+        if n > m:
+            # The old last point gains its two inner control points
+            first = min(first, m - 1)
+        self.changed = max(min(first, step), 0)
+        if n != m:
+            self.resize(n)
+        self.start = start
+        self.positions[self.changed:] = positions[self.changed:]
+        if n == 0:
+            return self.velocities, self.accelerations
+
+        if step == 0:
+            self.velocities[0] = start[0:2]
+            self.accelerations[0] = start[2:4]
+            step = 1
+
+        if step < n:
+            # Same arithmetic as GenerateVelocityAccelerations, in python floats
+            px = self.positions[step - 1:, 0].tolist()
+            py = self.positions[step - 1:, 1].tolist()
+            vx, vy = self.velocities[step - 1].tolist()
+            ax, ay = self.accelerations[step - 1].tolist()
+            rv = []
+            ra = []
+            for i in range(1, len(px)):
+                c0x, c0y, c1x, c1y = GenerateC1C2(vx, vy, ax, ay, px[i - 1], py[i - 1])
+                pvx, pvy, pax, pay = vx, vy, ax, ay
+                vx, vy = GenerateVelocity(c1x, c1y, px[i], py[i])
+                ax, ay = GenerateAcceleration(c0x, c0y, c1x, c1y, px[i], py[i])
+                vx = (vx / pvx) if pvx > 0 else vx
+                vy = (vy / pvy) if pvy > 0 else vy
+                ax = (ax / pax) if pax > 0 else ax
+                ay = (ay / pay) if pay > 0 else ay
+                rv.append((vx, vy))
+                ra.append((ax, ay))
+            self.velocities[step:] = rv
+            self.accelerations[step:] = ra
+
+        # Control polygon rows p_i, c0_i, c1_i for every point, as GeneratePoints
+        i = self.changed
+        p = self.positions[i : n - 1]
+        v = self.velocities[i : n - 1]
+        a = self.accelerations[i : n - 1]
+        self.points[3 * i :: 3] = self.positions[i:]
+        self.points[3 * i + 1 :: 3] = v / 3 + p
+        self.points[3 * i + 2 :: 3] = a / 6 + ((2 * v) / 3) + p
+        return self.velocities, self.accelerations
+
+    def control(self, masses):
+        n = len(self.positions)
+        m = np.repeat(np.asarray(masses, dtype=float)[:n], 3)[: max(3 * n - 2, 0)]
+        return self.points[:, 0], self.points[:, 1], m
@@ -0,0 +1,99 @@
+"""
+Point file parsing, see the README for the file format. The first line of a
+file is skipped and every following line holds 2 to 7 columns.
+
+ReadChunks - Stream a file as lists of whole lines
+ParseLines - Parse lines into point arrays, grouping rows by column count
+ReadPointFile - Parse a whole file into (positions, velocities, accelerations,
+                masses, has_vel, has_acc) arrays
+"""
+import numpy as np
+
+# column count: (velocity column, acceleration column, mass column)
+COLUMNS = {
+    2: (None, None, None),
+    3: (None, None, 2),
+    4: (2, None, None),
+    5: (2, None, 4),
+    6: (2, 4, None),
+    7: (2, 4, 6),
+}
+
+
+def ReadChunks(file, chunk_size=1 << 20):
+    rest = ""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split("\n")
+        rest = lines.pop()
+        yield lines
+    if rest:
+        yield [rest]
+
+
+def ParseLines(lines, allowed=COLUMNS):
+    rows = [line.split() for line in lines]
+    counts = np.fromiter(map(len, rows), dtype=int, count=len(rows))
+    keep = np.isin(counts, list(allowed))
+    order = np.cumsum(keep) - 1
+    n = int(keep.sum())
+
+    positions = np.zeros((n, 2))
+    velocities = np.zeros((n, 2))
+    accelerations = np.zeros((n, 2))
+    masses = np.ones(n)
+    has_vel = np.zeros(n, dtype=bool)
+    has_acc = np.zeros(n, dtype=bool)
+
+    for count in np.unique(counts[keep]):
+        index = np.nonzero(counts == count)[0]
+        text = " ".join(lines[i] for i in index)
+        value = np.fromstring(text, sep=" ").reshape(-1, count)
+        target = order[index]
+        vel, acc, mass = allowed[count]
+        positions[target] = value[:, 0:2]
+        if vel is not None:
+            velocities[target] = value[:, vel : vel + 2]
+            has_vel[target] = True
+        if acc is not None:
+            accelerations[target] = value[:, acc : acc + 2]
+            has_acc[target] = True
+        if mass is not None:
+            masses[target] = value[:, mass]
+    return positions, velocities, accelerations, masses, has_vel, has_acc
+
+
+def ReadPointFile(path, bezier=False, chunk_size=1 << 20):
+    parts = []
+    first = None
+    line = 0
+    with open(path, "r") as file:
+        for lines in ReadChunks(file, chunk_size):
+            start = line
+            line += len(lines)
+            # Skip the header line
+            lines = lines[max(1 - start, 0):]
+            if not bezier:
+                parts.append(ParseLines(lines))
+                continue
+
+            # For bezier only the first point may carry derivatives and every
+            # later point inherits them
+            if start <= 1 < line:
+                first = ParseLines(lines[:1], {c: COLUMNS[c] for c in (2, 3, 6, 7)})
+                parts.append(first)
+                lines = lines[1:]
+            parts.append(ParseLines(lines, {c: COLUMNS[c] for c in (2, 3)}))
+
+    if not parts:
+        parts.append(ParseLines([]))
+    arrays = [np.concatenate(column) for column in zip(*parts)]
+
+    if bezier and first is not None and len(first[0]) and first[4][0]:
+        for array, value in zip(arrays[1:3], first[1:3]):
+            array[:] = value[0]
+        arrays[4][:] = True
+        arrays[5][:] = first[5][0]
+    return tuple(arrays)
@@ -6,6 +6,7 @@ from PySide6.QtWidgets import (
     QHBoxLayout,
     QSlider,
     QPushButton,
+    QWidget,
 )
 from PySide6.QtCore import Qt, Signal, QSize
 from PySide6.QtGui import QFont, QIcon, QPixmap
@@ -425,3 +426,128 @@ class PointDetails(QFrame):
             text = "Acceleration: (-,-)"
 
         self.acc_label.setText(text)
+
+
+class PointDetailsPanel:
+    """
+    Virtualized list of PointDetails rows inside a scroll area. Only the rows
+    in view (plus overscan) exist, they are recycled and rebound on scroll
+    while two spacers stand in for the rows above and below.
+
+    create() - Build a new PointDetails row
+    bind(row, index) - Push point index into row
+    compact - Rows after the first hide their velocity and acceleration frames
+    """
+
+    def __init__(self, layout, scroll_area, create, bind, overscan=2):
+        self.layout = layout
+        self.scroll_area = scroll_area
+        self.create = create
+        self.bind = bind
+        self.overscan = overscan
+        self.count = 0
+        self.compact = False
+        self.rows = []
+        self.first = 0
+        self.height = None
+
+        self.top = QWidget()
+        self.bottom = QWidget()
+        self.top.setFixedHeight(0)
+        self.bottom.setFixedHeight(0)
+        self.layout.addWidget(self.top)
+        self.layout.addWidget(self.bottom)
+
+        scroll_bar = self.scroll_area.verticalScrollBar()
+        scroll_bar.valueChanged.connect(lambda value: self.update())
+        scroll_bar.rangeChanged.connect(lambda low, high: self.update())
+
+    def newRow(self):
+        row = self.create()
+        if self.height is None:
+            # Full and compact heights, measured once from the first row
+            full = row.sizeHint().height()
+            row.vel_frame.setVisible(False)
+            row.acc_frame.setVisible(False)
+            self.height = full, row.sizeHint().height()
+        self.layout.insertWidget(len(self.rows) + 1, row)
+        self.rows.append(row)
+        return row
+
+    def spacing(self):
+        # Style defaults report -1
+        return max(self.layout.spacing(), 0)
+
+    def rowHeight(self, index):
+        return self.height[1] if self.compact and index != 0 else self.height[0]
+
+    def rowTop(self, index):
+        # Offset of a row below the top spacer, each row is followed by the spacing
+        if index <= 0:
+            return 0
+        spacing = self.spacing()
+        return self.height[0] + spacing + (index - 1) * (self.rowHeight(1) + spacing)
+
+    def indexAt(self, y):
+        # y is in scroll area content coordinates, rows start after the top
+        # margin, the top spacer and one spacing
+        y -= self.layout.contentsMargins().top() + self.spacing()
+        if y < self.rowTop(1):
+            return 0
+        return 1 + int((y - self.rowTop(1)) // (self.rowHeight(1) + self.spacing()))
+
+    def row(self, index):
+        # Bound row for a point, None while it is scrolled out of view
+        k = index - self.first
+        if 0 <= k < len(self.rows) and self.rows[k].isVisibleTo(self.scroll_area):
+            return self.rows[k]
+        return None
+
+    def visibleRows(self):
+        for index in range(self.first, self.first + len(self.rows)):
+            row = self.row(index)
+            if row is not None:
+                yield index, row
+
+    def setCompact(self, compact):
+        self.compact = compact
+        self.update(0)
+
+    def setCount(self, count, changed=0):
+        # Rows bound to indices from changed onwards are rebound
+        self.count = count
+        self.update(changed)
+
+    def update(self, changed=None):
+        if self.count == 0:
+            for row in self.rows:
+                row.setVisible(False)
+            self.top.setFixedHeight(0)
+            self.bottom.setFixedHeight(0)
+            return
+        if not self.rows:
+            self.newRow()
+
+        y = self.scroll_area.verticalScrollBar().value()
+        view = self.scroll_area.viewport().height()
+        first = max(self.indexAt(y) - self.overscan, 0)
+        last = min(self.indexAt(y + view) + self.overscan + 1, self.count)
+        while len(self.rows) < last - first:
+            self.newRow()
+
+        if first != self.first:
+            changed = 0
+        self.first = first
+        for k, row in enumerate(self.rows):
+            index = first + k
+            if index >= last:
+                row.setVisible(False)
+                continue
+            rebind = changed is not None and index >= changed
+            if rebind or not row.isVisibleTo(self.scroll_area):
+                self.bind(row, index)
+                row.setFixedHeight(self.rowHeight(index))
+            row.setVisible(True)
+
+        self.top.setFixedHeight(self.rowTop(first))
+        self.bottom.setFixedHeight(self.rowTop(self.count) - self.rowTop(last))
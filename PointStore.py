@@ -0,0 +1,185 @@
+"""
+PointStore - Points kept as contiguous arrays with no fixed cap
+    positions, velocities, accelerations - (capacity, 2) arrays
+    masses - (capacity,) array
+    has_vel, has_acc - Presence masks for velocities and accelerations
+    newtonInterpolant - Every point followed by its velocity and acceleration if set
+    bezierInterpolant - End points and every point without a velocity
+Point - View of one row of a PointStore, exposing p, v, a and m
+"""
+import numpy as np
+
+
+class Point:
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def p(self):
+        return self.store.positions[self.index]
+
+    @p.setter
+    def p(self, value):
+        self.store.positions[self.index] = value
+
+    @property
+    def v(self):
+        if not self.store.has_vel[self.index]:
+            return None
+        return self.store.velocities[self.index]
+
+    @v.setter
+    def v(self, value):
+        self.store.has_vel[self.index] = value is not None
+        if value is not None:
+            self.store.velocities[self.index] = value
+
+    @property
+    def a(self):
+        if not self.store.has_acc[self.index]:
+            return None
+        return self.store.accelerations[self.index]
+
+    @a.setter
+    def a(self, value):
+        self.store.has_acc[self.index] = value is not None
+        if value is not None:
+            self.store.accelerations[self.index] = value
+
+    @property
+    def m(self):
+        return float(self.store.masses[self.index])
+
+    @m.setter
+    def m(self, value):
+        self.store.masses[self.index] = value
+
+    def __iter__(self):
+        return iter((self.p, self.v, self.a, self.m))
+
+
+class PointStore:
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.accelerations = np.zeros((capacity, 2))
+        self.masses = np.ones(capacity)
+        self.has_vel = np.zeros(capacity, dtype=bool)
+        self.has_acc = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError("point index out of range")
+        return Point(self, index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield Point(self, i)
+
+    def reserve(self, capacity):
+        if capacity <= len(self.masses):
+            return
+        # Grow geometrically so appends stay amortised O(1)
+        capacity = max(capacity, 2 * len(self.masses))
+        for name in (
+            "positions",
+            "velocities",
+            "accelerations",
+            "masses",
+            "has_vel",
+            "has_acc",
+        ):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self.count] = old[: self.count]
+            setattr(self, name, new)
+        self.masses[self.count :] = 1
+
+    def append(self, px, py, vx=None, vy=None, ax=None, ay=None, m=1):
+        self.reserve(self.count + 1)
+        i = self.count
+        self.count += 1
+        self.positions[i] = px, py
+        self.velocities[i] = (vx, vy) if vx is not None else (0, 0)
+        self.accelerations[i] = (ax, ay) if ax is not None else (0, 0)
+        self.masses[i] = m
+        self.has_vel[i] = vx is not None
+        self.has_acc[i] = ax is not None
+
+    def extend(self, positions, velocities, accelerations, masses, has_vel, has_acc):
+        n = len(positions)
+        self.reserve(self.count + n)
+        rows = slice(self.count, self.count + n)
+        self.positions[rows] = positions
+        self.velocities[rows] = velocities
+        self.accelerations[rows] = accelerations
+        self.masses[rows] = masses
+        self.has_vel[rows] = has_vel
+        self.has_acc[rows] = has_acc
+        self.count += n
+
+    def pop(self, index):
+        for array in (
+            self.positions,
+            self.velocities,
+            self.accelerations,
+            self.masses,
+            self.has_vel,
+            self.has_acc,
+        ):
+            array[index : self.count - 1] = array[index + 1 : self.count]
+        self.count -= 1
+        self.masses[self.count] = 1
+        self.has_vel[self.count] = False
+        self.has_acc[self.count] = False
+
+    def swap(self, i, j):
+        for array in (
+            self.positions,
+            self.velocities,
+            self.accelerations,
+            self.masses,
+            self.has_vel,
+            self.has_acc,
+        ):
+            array[[i, j]] = array[[j, i]]
+
+    def clear(self):
+        self.count = 0
+        self.masses[:] = 1
+        self.has_vel[:] = False
+        self.has_acc[:] = False
+
+    def newtonInterpolant(self):
+        n = self.count
+        has_vel = self.has_vel[:n]
+        values = np.stack(
+            (self.positions[:n], self.velocities[:n], self.accelerations[:n]),
+            axis=1,
+        )
+        mask = np.stack(
+            (np.ones(n, dtype=bool), has_vel, has_vel & self.has_acc[:n]),
+            axis=1,
+        )
+        values = values[mask]
+        return values[:, 0], values[:, 1], self.masses[:n]
+
+    def bezierInterpolant(self):
+        n = self.count
+        mask = ~self.has_vel[:n]
+        if n:
+            mask[[0, -1]] = True
+        return (
+            self.positions[:n, 0][mask],
+            self.positions[:n, 1][mask],
+            self.masses[:n][mask],
+        )
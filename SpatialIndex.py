@@ -0,0 +1,103 @@
+"""
+SpatialGrid - Uniform grid over 2D handles for radius queries
+    build - Bucket every valid handle, handles are identified by their row
+    move - Move one handle without rebuilding the grid
+    query - Handles strictly within radius of (x, y), in ascending order
+    cell - Grid spacing, best kept close to the query radius
+
+The grid is a sorted array of cell keys, so a query costs one binary search
+per grid column it touches. Moved handles go to a small overlay until the
+next build.
+"""
+import numpy as np
+
+
+def CellKeys(cx, cy):
+    # Column in the high 32 bits, so keys of one column are contiguous in y
+    return (cx.astype(np.int64) << 32) + (cy.astype(np.int64) + (1 << 31))
+
+
+class SpatialGrid:
+    def __init__(self, cell=1.0):
+        self.cell = cell
+        self.positions = np.zeros((0, 2))
+        self.valid = np.zeros(0, dtype=bool)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.stale = np.zeros(0, dtype=bool)
+        self.overlay = {}
+        self.overlay_cell = {}
+
+    def __len__(self):
+        return len(self.ids) + len(self.overlay_cell)
+
+    def cellOf(self, x, y):
+        return int(np.floor(x / self.cell)), int(np.floor(y / self.cell))
+
+    def build(self, positions, valid, cell=None):
+        if cell is not None and cell > 0.0:
+            self.cell = cell
+        self.positions = np.array(positions, dtype=float).reshape(-1, 2)
+        self.valid = np.array(valid, dtype=bool)
+        ids = np.nonzero(self.valid)[0]
+        cells = np.floor(self.positions[ids] / self.cell)
+        keys = CellKeys(cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = ids[order]
+        self.stale = np.zeros(len(self.positions), dtype=bool)
+        self.overlay = {}
+        self.overlay_cell = {}
+
+    def move(self, handle, x, y):
+        self.positions[handle] = x, y
+        self.valid[handle] = True
+        self.stale[handle] = True
+        old = self.overlay_cell.get(handle)
+        if old is not None:
+            self.overlay[old].discard(handle)
+        cell = self.cellOf(x, y)
+        self.overlay.setdefault(cell, set()).add(handle)
+        self.overlay_cell[handle] = cell
+
+        # Fold the overlay back in once it stops being small
+        if len(self.overlay_cell) > 64 + len(self.ids) // 16:
+            self.build(self.positions, self.valid)
+
+    def query(self, x, y, radius):
+        x0, y0 = self.cellOf(x - radius, y - radius)
+        x1, y1 = self.cellOf(x + radius, y + radius)
+
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.ids) // 8 + 16:
+            # The radius spans most of the grid, scanning is cheaper
+            candidates = np.nonzero(self.valid)[0]
+        else:
+            columns = np.arange(x0, x1 + 1)
+            low = np.searchsorted(self.keys, CellKeys(columns, np.full_like(columns, y0)))
+            high = np.searchsorted(
+                self.keys, CellKeys(columns, np.full_like(columns, y1)), side="right"
+            )
+            parts = [self.ids[l:h] for l, h in zip(low, high) if h > l]
+            candidates = np.concatenate(parts) if parts else self.ids[:0]
+            candidates = candidates[~self.stale[candidates]]
+            if self.overlay_cell:
+                if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(self.overlay):
+                    cells = (
+                        (cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)
+                    )
+                else:
+                    cells = (
+                        (cx, cy)
+                        for cx, cy in self.overlay
+                        if x0 <= cx <= x1 and y0 <= cy <= y1
+                    )
+                moved = [
+                    handle for cell in cells for handle in self.overlay.get(cell, ())
+                ]
+                candidates = np.concatenate(
+                    (candidates, np.array(moved, dtype=np.int64))
+                )
+
+        offset = self.positions[candidates] - (x, y)
+        hits = candidates[np.einsum("ij,ij->i", offset, offset) < radius * radius]
+        return np.sort(hits)
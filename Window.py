@@ -1,8 +1,9 @@
 from MainWindow import *
-from PySide6.QtWidgets import QMessageBox, QFileDialog, QMainWindow
+from PySide6.QtWidgets import QMessageBox, QFileDialog, QMainWindow, QComboBox
 from PySide6.QtGui import QIcon
 from PySide6.QtCore import QPropertyAnimation, QEasingCurve
 from GraphContext import *
+from Parser import *
 import os
 
 
@@ -21,64 +22,31 @@ class Window(QMainWindow):
         self.ui.open_menu.clicked.connect(self.openMenu) 
 
         #Setup GraphContext
-        self.graph = GraphContext(self.ui.graph, self.ui.verticalLayout_8)
+        self.graph = GraphContext(
+            self.ui.graph, self.ui.verticalLayout_8, self.ui.side_menu_body_container
+        )
+
+        #Interpolation type selector next to the file options
+        self.interpolation = QComboBox(self.ui.file_options)
+        self.interpolation.setObjectName("interpolation")
+        for type in InterpolationType:
+            self.interpolation.addItem(type.name.capitalize(), type)
+        self.interpolation.setCurrentIndex(
+            self.interpolation.findData(self.graph.interpolation_type)
+        )
+        self.interpolation.currentIndexChanged.connect(self.interpolationChanged)
+        self.ui.horizontalLayout_9.addWidget(self.interpolation, 0, QtCore.Qt.AlignLeft)
+
+    def closeEvent(self, event):
+        self.graph.close()
+        super().closeEvent(event)
 
     def newFile(self):
         self.graph.clear()
 
-    def newtonRead(self,lines):
-
-        for [i,line] in enumerate(lines):
-            if i == 0 or i >= self.graph.max_point:
-                continue
-            parse = line.split(' ')
-
-            if len(parse) == 2:
-                self.graph.addPoint(px=float(parse[0]),py=float(parse[1]))
-            elif len(parse) == 3:
-                self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),m=float(parse[2]))
-            elif len(parse) == 4:
-                self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=float(parse[2]),vy=float(parse[3]))
-            elif len(parse) == 5:
-                self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=float(parse[2]),vy=float(parse[3]),m=float(parse[4]))
-            elif len(parse) == 6:
-                self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=float(parse[2]),vy=float(parse[3]),ax=float(parse[4]),ay=float(parse[5]))
-            elif len(parse) == 7:
-                self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=float(parse[2]),vy=float(parse[3]),ax=float(parse[4]),ay=float(parse[5]),m=float(parse[6]))
-
-    def bezierRead(self,lines):
-
-        rvx = rvy = rax = ray = None
-        for [i,line] in enumerate(lines):
-            if i == 0 or i >= self.graph.max_point:
-                continue
-
-            parse = line.split(' ')
-
-            if i == 1:
-                if len(parse) == 2:
-                    self.graph.addPoint(px=float(parse[0]),py=float(parse[1]))
-                elif len(parse) == 3:
-                    self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),m=float(parse[2]))
-                elif len(parse) == 6:
-                    rvx = float(parse[2])
-                    rvy = float(parse[3])
-                    rax = float(parse[4])
-                    ray = float(parse[5])
-                    self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=rvx,vy=rvy,ax=rax,ay=ray)
-                elif len(parse) == 7:
-                    rvx = float(parse[2])
-                    rvy = float(parse[3])
-                    rax = float(parse[4])
-                    ray = float(parse[5])
-                    self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=rvx,vy=rvy,ax=rax,ay=ray,m=float(parse[6]))
-            else:
-                if len(parse) == 2:
-                    self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=rvx,vy=rvy,ax=rax,ay=ray)
-                elif len(parse) == 3:
-                    self.graph.addPoint(px=float(parse[0]),py=float(parse[1]),vx=rvx,vy=rvy,ax=rax,ay=ray,m=float(parse[2]))
-
-            
+    def interpolationChanged(self, index):
+        self.graph.setInterpolationType(self.interpolation.itemData(index))
+
     def openFile(self):
         result = QFileDialog.getOpenFileName(caption="Select a file",
                                              dir=os.getcwd(),
@@ -88,12 +56,9 @@ class Window(QMainWindow):
 
         self.graph.clear()
 
-        with open(result[0], 'r') as file:
-            lines = file.readlines()
-            if self.graph.interpolation_type == InterpolationType.NEWTON:
-                self.newtonRead(lines)
-            elif self.graph.interpolation_type == InterpolationType.BEZIER:
-                self.bezierRead(lines)
+        # Parse the whole file into arrays and insert them with a single refresh
+        bezier = self.graph.interpolation_type == InterpolationType.BEZIER
+        self.graph.addPoints(*ReadPointFile(result[0], bezier))
 
 
     def openMenu(self):
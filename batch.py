@@ -0,0 +1,115 @@
+"""
+Headless batch evaluation of point files, without Qt.
+
+    python batch.py ReadTest.txt other.txt --type bezier --samples 500 --format csv
+
+Each input is read in the same format as the Load file tool (first line is
+skipped, then one point per line) and its curve is written to the output
+directory as <name>.npy or <name>.csv with one x, y row per sample. Inputs
+from several directories keep their paths relative to the deepest directory
+they share, so a/pts.txt and b/pts.txt become <output>/a/pts.npy and
+<output>/b/pts.npy.
+Handle values are used as written, without the +-5 clamp the graph applies
+when a point is added by hand.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import numpy as np
+from InterpolationModel import *
+from Parser import *
+
+
+def EvaluateFile(
+    path, type="newton", samples=500, chebyshev=False, de_casteljau=False
+):
+    type = InterpolationType[type.upper()]
+    model = InterpolationModel(type)
+    model.lagrange_chebyshev = chebyshev
+    model.use_de_casteljau = de_casteljau
+    model.add(
+        *ReadPointFile(path, bezier=type == InterpolationType.BEZIER), limit=None
+    )
+    model.sample_count = samples
+    model.adaptive_sample = False
+    model.update()
+    x, y = model.evaluate()
+    return np.column_stack((x, y))
+
+
+def OutputPaths(paths, output, format):
+    # Mirror each input below the directory all of them share
+    paths = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    targets = [
+        os.path.join(
+            output, "%s.%s" % (os.path.splitext(os.path.relpath(path, root))[0], format)
+        )
+        for path in paths
+    ]
+
+    # Only inputs differing by extension alone can still collide
+    seen = {}
+    for path, target in zip(paths, targets):
+        if target in seen:
+            raise ValueError("%s and %s both write %s" % (seen[target], path, target))
+        seen[target] = path
+    return targets
+
+
+def ProcessFile(job):
+    path, type, samples, target, format, chebyshev, de_casteljau = job
+    curve = EvaluateFile(path, type, samples, chebyshev, de_casteljau)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    if format == "npy":
+        np.save(target, curve)
+    else:
+        np.savetxt(target, curve, delimiter=",", header="x,y", comments="")
+    return target, len(curve)
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Evaluate point files without the GUI")
+    parser.add_argument("files", nargs="+", help="point files to evaluate")
+    parser.add_argument(
+        "--type",
+        choices=[type.name.lower() for type in InterpolationType],
+        default="newton",
+    )
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument(
+        "--chebyshev", action="store_true", help="chebyshev spaced lagrange nodes"
+    )
+    parser.add_argument(
+        "--de-casteljau",
+        action="store_true",
+        help="bezier curves through De Casteljau instead of the cached basis",
+    )
+    parser.add_argument("--format", choices=("npy", "csv"), default="npy")
+    parser.add_argument("--output", default=".")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        targets = OutputPaths(args.files, args.output, args.format)
+    except ValueError as error:
+        parser.error(str(error))
+    jobs = [
+        (
+            path,
+            args.type,
+            args.samples,
+            target,
+            args.format,
+            args.chebyshev,
+            args.de_casteljau,
+        )
+        for path, target in zip(args.files, targets)
+    ]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for target, count in executor.map(ProcessFile, jobs, chunksize=16):
+            print("%s (%i samples)" % (target, count))
+
+
+if __name__ == "__main__":
+    run()
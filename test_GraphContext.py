@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("pyqtgraph")
+QtCore = pytest.importorskip("PySide6.QtCore")
+from GraphContext import *
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def test_scheduler_counts_each_request_once(app):
+    calls = []
+    scheduler = RefreshScheduler(lambda: calls.append(scheduler.satisfy()))
+
+    # Three requests in one frame are one recompute and two merges
+    for _ in range(3):
+        scheduler.request()
+    scheduler.flush()
+    assert scheduler.stats() == {"requested": 3, "frames": 1, "merged": 2, "dropped": 0}
+
+    scheduler.request()
+    scheduler.request()
+    scheduler.cancel()
+    scheduler.request()
+    scheduler.flush()
+    stats = scheduler.stats()
+    assert len(calls) == stats["frames"] == 2
+    assert stats["requested"] == stats["frames"] + stats["merged"] + stats["dropped"]
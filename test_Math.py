@@ -0,0 +1,253 @@
+import warnings
+from math import comb
+import numpy as np
+from Math import *
+from InterpolationModel import *
+
+
+def test_lagrange_weights_large_n():
+    n = 200
+    lagrange = BarycentricLagrange()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        lagrange.resize(n)
+
+    # Equispaced weights are (-1)^j C(n-1, j) up to a common factor
+    mid = (n - 1) // 2
+    expected = np.array([(-1) ** j * comb(n - 1, j) / comb(n - 1, mid) for j in range(n)])
+    weights = lagrange.weights * expected[mid] / lagrange.weights[mid]
+    assert np.all(lagrange.weights != 0)
+    assert np.allclose(weights, expected, rtol=1e-9, atol=0)
+
+
+def test_lagrange_passes_through_nodes_large_n():
+    n = 200
+    rng = np.random.default_rng(0)
+    model = InterpolationModel(InterpolationType.LAGRANGE)
+    model.adaptive_sample = False
+    model.add(rng.uniform(-50, 50, (n, 2)))
+    model.update()
+    model.evaluate()
+
+    x, y = model.lagrange.evaluate(
+        model.points.positions[:n, 0], model.points.positions[:n, 1], np.arange(n)
+    )
+    assert np.allclose(x, model.points.positions[:n, 0])
+    assert np.allclose(y, model.points.positions[:n, 1])
+
+
+def test_lagrange_resize_after_delete():
+    for chebyshev in (False, True):
+        lagrange = BarycentricLagrange(chebyshev)
+        lagrange.resize(5)
+        lagrange.resize(0)
+        lagrange.resize(1)
+        assert len(lagrange) == 1
+
+
+def test_lagrange_chebyshev_from_model():
+    model = InterpolationModel(InterpolationType.LAGRANGE)
+    model.adaptive_sample = False
+    model.lagrange_chebyshev = True
+    model.add([[0, 0], [1, 2], [3, 1]])
+    model.update()
+    model.evaluate()
+    assert model.lagrange.chebyshev
+
+
+def test_hermite_adaptive_resamples_only_dirty_segments():
+    rng = np.random.default_rng(1)
+    n = 5000
+    positions = np.cumsum(rng.uniform(0, 1, (n, 2)), axis=0)
+    zeros = np.zeros((n, 2))
+    flags = np.zeros(n, dtype=bool)
+    has_acc = flags.copy()
+    has_acc[::7] = True
+    spline = HermiteSpline()
+    spline.adapt(0.01, 0.01, 0.5, 4096)
+    x, y = spline.sync(positions, zeros, rng.uniform(-1, 1, (n, 2)), flags, has_acc)
+
+    # The budget is smaller than the segment count, every point still shows
+    points = set(zip(x, y))
+    assert all((px, py) in points for px, py in positions)
+
+    parts = list(spline.parts)
+    positions[2500] += 0.3
+    x, y = spline.sync(positions, zeros, spline.state[:, 4:6].copy(), flags, has_acc)
+    kept = [i for i in range(n - 1) if spline.parts[i] is parts[i]]
+    assert kept == [i for i in range(n - 1) if not 2498 <= i < 2502]
+
+    fresh = HermiteSpline()
+    fresh.adapt(0.01, 0.01, 0.5, 4096)
+    fx, fy = fresh.sync(positions, zeros, spline.state[:, 4:6].copy(), flags, has_acc)
+    assert np.array_equal(x, fx) and np.array_equal(y, fy)
+
+
+def test_hermite_sample_count():
+    model = InterpolationModel(InterpolationType.HERMITE)
+    model.adaptive_sample = False
+    model.add([[0, 0], [1, 2], [3, 1], [4, 4], [6, 0]])
+    for samples in (50, 400):
+        model.sample_count = samples
+        model.update()
+        x, y = model.evaluate()
+        assert samples <= len(x) < samples + 2 * 4
+
+    # Adaptive sampling follows the pixel size, and finer pixels need more samples
+    model.adaptive_sample = True
+    model.pixel_size = (0.1, 0.1)
+    coarse = len(model.evaluate()[0])
+    model.pixel_size = (0.001, 0.001)
+    assert len(model.evaluate()[0]) > coarse
+
+
+def test_bezier_de_casteljau_toggle_and_high_degree():
+    rng = np.random.default_rng(2)
+    model = InterpolationModel(InterpolationType.BEZIER)
+    model.adaptive_sample = False
+    model.add(rng.uniform(-5, 5, (40, 2)))
+    model.update()
+    x, y = model.evaluate()
+    model.use_de_casteljau = True
+    dx, dy = model.evaluate()
+    assert np.allclose(x, dx) and np.allclose(y, dy)
+
+    # Past BernsteinMaxDegree the binomials overflow, De Casteljau takes over
+    model.use_de_casteljau = False
+    model.sample_count = 100
+    model.add(rng.uniform(-5, 5, (BernsteinMaxDegree + 60, 2)))
+    model.update()
+    x, y = model.evaluate()
+    assert len(x) == model.sample_count and np.isfinite(x).all() and np.isfinite(y).all()
+
+
+def test_de_casteljau_tangent_and_subdivide_take_t():
+    rng = np.random.default_rng(3)
+    px, py = rng.uniform(-5, 5, (2, 7))
+    m = rng.uniform(0.5, 2, 7)
+    batch = DeCasteljauBatch()
+    t = np.linspace(0, 1, num=21)
+    tx, ty = batch.tangent(px, py, m, t)
+
+    # An unrelated evaluation in between must not change the answer
+    batch.evaluate(px[:3], py[:3], m[:3], np.linspace(0, 1, num=5))
+    h = 1e-6
+    ux = np.clip(t + h, 0, 1)
+    lx = np.clip(t - h, 0, 1)
+    (x1, y1), (x0, y0) = RationalBezierBatch(px, py, m, ux), RationalBezierBatch(px, py, m, lx)
+    assert np.allclose(tx, (x1 - x0) / (ux - lx), atol=1e-4)
+    assert np.allclose(ty, (y1 - y0) / (ux - lx), atol=1e-4)
+
+    (lx, ly, lm), (rx, ry, rm) = batch.subdivide(px, py, m, 0.3)
+    x, y = RationalBezierBatch(px, py, m, [0.15, 0.65])
+    assert np.allclose(RationalBezierBatch(lx, ly, lm, [0.5]), (x[:1], y[:1]))
+    assert np.allclose(RationalBezierBatch(rx, ry, rm, [0.5]), (x[1:], y[1:]))
+
+
+def test_adaptive_bezier_uses_the_basis_cache():
+    rng = np.random.default_rng(4)
+    model = InterpolationModel(InterpolationType.BEZIER)
+    model.add(rng.uniform(-5, 5, (30, 2)))
+    model.pixel_size = (0.001, 0.001)
+    model.update()
+    x, y = model.evaluate()
+    px, py = model.interpolant
+    t, _, _ = AdaptiveSample(
+        lambda t: RationalBezierBatch(px, py, model.mass, t), 0.001, 0.001, depth=BezierGridDepth
+    )
+    bx, by = RationalBezierBatch(px, py, model.mass, t)
+    assert np.allclose(x, bx) and np.allclose(y, by)
+
+    # A drag keeps the degree, every basis after the first frame is a hit
+    samples, midpoints = BasisCacheInfo()
+    model.points[3].p[0] += 0.5
+    model.update()
+    model.evaluate()
+    after = BasisCacheInfo()
+    assert after[0].hits > samples.hits and after[1].hits > midpoints.hits
+    assert after[0].misses == samples.misses and after[1].misses == midpoints.misses
+
+
+def test_switch_to_bezier_keeps_every_point():
+    model = InterpolationModel(InterpolationType.NEWTON)
+    model.add([[0, 0], [1, 1], [3, 0], [4, 2]])
+    model.addHandle(0, 1, 1)
+    model.addHandle(1, 2, 2)
+    model.addHandle(1, 2, 3)
+    model.setInterpolationType(InterpolationType.BEZIER)
+    model.update()
+    assert list(model.interpolant[0]) == [0, 1, 3, 4]
+    assert model.points[0].v is not None
+    assert model.points[1].v is None and model.points[1].a is None
+
+
+def test_de_casteljau_matches_bernstein():
+    rng = np.random.default_rng(5)
+    batch = DeCasteljauBatch(chunk=7)
+    for n in (1, 2, 3, 12, 60):
+        px, py = rng.uniform(-5, 5, (2, n))
+        m = rng.uniform(0.5, 2, n)
+        t = np.concatenate((np.linspace(0, 1, num=50), rng.uniform(0, 1, 13)))
+        x, y = batch.evaluate(px, py, m, t)
+        bx, by = RationalBezierBatch(px, py, m, t)
+        assert np.allclose(x, bx, atol=1e-12) and np.allclose(y, by, atol=1e-12)
+
+
+def test_model_value_edits():
+    model = InterpolationModel(InterpolationType.NEWTON)
+    model.add([[0, 0], [1, 1]])
+    model.setPosition(1, 0, 2.5)
+    model.setMass(1, 3.0)
+    assert model.setHandle(0, SelectionType.ACC, 1, 0.5)
+    assert not model.setHandle(0, SelectionType.VEL, 0, 1.5)
+    assert list(model.points[0].v) == [1.5, 0] and list(model.points[0].a) == [0, 0.5]
+    assert list(model.points[1].p) == [2.5, 1] and model.points[1].m == 3.0
+    assert model.changedFrom() == len(model)
+
+    bezier = InterpolationModel(InterpolationType.BEZIER)
+    bezier.add([[0, 0], [1, 1], [2, 0], [3, 1]])
+    bezier.addHandle(0, 1, 1)
+    bezier.addHandle(0, 1, 2)
+    bezier.update()
+    bezier.setPosition(2, 1, 0.5)
+    bezier.update()
+    assert bezier.changedFrom() <= 2
+
+
+def test_bezier_chain_suffix_matches_full_recompute():
+    rng = np.random.default_rng(6)
+    chain = BezierChain()
+    positions = rng.uniform(-5, 5, (20, 2))
+    v0, a0 = np.array([1.0, 0.5]), np.array([0.2, -0.3])
+    for step in range(300):
+        op = rng.integers(0, 5)
+        if op == 0:
+            positions[rng.integers(0, len(positions))] += rng.uniform(-1, 1, 2)
+        elif op == 1:
+            positions = np.vstack((positions, rng.uniform(-5, 5, (rng.integers(1, 4), 2))))
+        elif op == 2 and len(positions) > 1:
+            positions = np.delete(positions, rng.integers(0, len(positions)), axis=0)
+        elif op == 3:
+            v0 = v0 + rng.uniform(-0.2, 0.2, 2)
+        elif op == 4:
+            chain.clear()
+        masses = rng.uniform(0.5, 2, len(positions))
+
+        velocities, accelerations = chain.sync(positions, v0, a0)
+        fresh = BezierChain()
+        fv, fa = fresh.sync(positions, v0, a0)
+        assert np.array_equal(velocities, fv) and np.array_equal(accelerations, fa)
+        for got, want in zip(chain.control(masses), fresh.control(masses)):
+            assert np.array_equal(got, want)
+
+    # And the list based generation the chain replaced
+    px, py = positions[:, 0].tolist(), positions[:, 1].tolist()
+    rvx, rvy, rax, ray = [], [], [], []
+    GenerateVelocityAccelerations(rvx, rvy, rax, ray, px, py, *v0, *a0)
+    assert np.array_equal(velocities, np.column_stack((rvx, rvy)))
+    assert np.array_equal(accelerations, np.column_stack((rax, ray)))
+    rx, ry, rm = [], [], []
+    GeneratePoints(rx, ry, rm, px, py, masses.tolist(), rvx, rvy, rax, ray)
+    control = chain.control(masses)
+    assert np.array_equal(control[0], rx) and np.array_equal(control[1], ry)
+    assert np.array_equal(control[2], rm)
@@ -0,0 +1,34 @@
+import os
+import numpy as np
+import pytest
+from batch import *
+
+
+def test_duplicate_names_keep_their_directories(tmp_path):
+    source = open("ReadTest.txt").read()
+    paths = []
+    for folder in ("a", "b"):
+        os.makedirs(tmp_path / folder)
+        paths.append(str(tmp_path / folder / "pts.txt"))
+        open(paths[-1], "w").write(source)
+
+    output = str(tmp_path / "out")
+    targets = OutputPaths(paths, output, "npy")
+    assert targets == [
+        os.path.join(output, "a", "pts.npy"),
+        os.path.join(output, "b", "pts.npy"),
+    ]
+    for path, target in zip(paths, targets):
+        ProcessFile((path, "newton", 20, target, "npy", False, False))
+        assert np.load(target).shape == (20, 2)
+
+
+def test_single_file_goes_to_output(tmp_path):
+    assert OutputPaths(["ReadTest.txt"], str(tmp_path), "csv") == [
+        os.path.join(str(tmp_path), "ReadTest.csv")
+    ]
+
+
+def test_same_name_different_extension_fails(tmp_path):
+    with pytest.raises(ValueError):
+        OutputPaths(["pts.txt", "pts.dat"], str(tmp_path), "npy")